@@ -0,0 +1,184 @@
+"""Seeded synthetic users, transactions and catalogs in the app's CSV schemas.
+
+    python -m benchmarks.generate --rows 1m --catalog 10k --out bench_data/
+
+Transactions follow ``fake_transactions.csv`` (Date, Category, Merchant,
+Amount), one row per day-dated purchase drawn from the merchant profiles
+below. Modules and challenges follow ``modules.csv`` and ``challenges.csv``
+with tags drawn from the same goal and trigger vocabularies as the real
+catalogs, so every scoring path gets exercised. The same seed always
+produces the same files.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from centinel.triggers import TRIGGERS
+
+# (category, merchant, relative frequency, mean amount, std)
+MERCHANTS = [
+    ("Dining Out", "KFC", 14, -36, 16), ("Dining Out", "Local Tapas", 9, -41, 13),
+    ("Entertainment", "Cinema City", 6, -20, 14), ("Entertainment", "Coffee Shop", 30, -10, 3),
+    ("Groceries", "Mercadona", 13, -41, 13), ("Groceries", "Lidl", 6, -34, 14),
+    ("Healthcare", "Farmacia", 10, -43, 12),
+    ("Investments", "Crypto Wallet", 5, 76, 41), ("Investments", "Index ETF", 4, 94, 23),
+    ("Investments", "Stock App", 3, 101, 39),
+    ("Rent", "Landlord Transfer", 1, -586, 38), ("Salary", "Monthly Salary", 1, 1800, 70),
+    ("Savings", "ING Savings", 8, 64, 22), ("Savings", "Vault Transfer", 6, 61, 26),
+    ("Subscriptions", "Netflix", 4, -12, 4), ("Subscriptions", "Spotify", 4, -11, 3),
+    ("Subscriptions", "HBO Max", 2, -10, 3), ("Subscriptions", "Notion", 2, -12, 3),
+    ("Transport", "Metro BCN", 12, -26, 13), ("Transport", "Cabify", 8, -28, 13),
+    ("Transport", "ATM Withdrawal", 4, -60, 30), ("Transport", "PayPal", 3, -25, 10),
+    ("Utilities", "Electric Co", 4, -34, 14), ("Utilities", "Water Inc", 3, -27, 15),
+]
+GOALS = [
+    "save_money", "get_financial_control", "start_investing", "reduce_debt", "spend_better",
+    "build_savings_buffer", "budget_consistently", "optimize_subscriptions", "boost_income",
+    "understand_credit", "avoid_scam_investments", "understand_current_events", "learn_finance_history",
+    "decode_inflation", "understand_investing_terms", "learn_wealth_inequality", "get_news_literacy",
+]
+ACHIEVEMENTS = ["budget_created", "stick_to_budget", "completed_5_modules", "used_token", "invested_in_crypto"]
+PATHS = ["Budgeting Basics", "Intro to Investing", "Financial Resilience", "Money Mindset"]
+LEVELS = ["beginner", "intermediate", "advanced"]
+EXCLUSIVE = ["free", "premium_or_token"]  # as in modules.csv; the cards lock the second
+
+
+def parse_count(text):
+    """``"10k"`` -> 10000, ``"1m"`` -> 1000000."""
+    text = str(text).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def _tag_lists(rng, vocabulary, n, low, high):
+    counts = rng.integers(low, high + 1, n)
+    picks = rng.integers(0, len(vocabulary), counts.sum())
+    tags = np.asarray(vocabulary, dtype=object)[picks]
+    return [";".join(dict.fromkeys(chunk)) for chunk in np.split(tags, np.cumsum(counts)[:-1])]
+
+
+def _labels(values, pick):
+    # Categorical codes keep 10M-row frames small; the CSV holds the plain strings.
+    categories = list(dict.fromkeys(values))
+    codes = np.array([categories.index(v) for v in values])[pick]
+    return pd.Categorical.from_codes(codes, categories)
+
+
+def transactions(n, seed=0, end="2025-06-30"):
+    """``n`` transactions, oldest first, over at least 120 days and about 300 per day."""
+    rng = np.random.default_rng(seed)
+    days = max(120, n // 300)
+    weights = np.array([m[2] for m in MERCHANTS], dtype=float)
+    pick = rng.choice(len(MERCHANTS), n, p=weights / weights.sum())
+    mean = np.array([m[3] for m in MERCHANTS], dtype=float)[pick]
+    std = np.array([m[4] for m in MERCHANTS], dtype=float)[pick]
+    amount = mean + std * rng.standard_normal(n)
+    # Keep each merchant's sign, like the real exports.
+    amount = np.where(mean < 0, -np.abs(amount), np.abs(amount)).round(2)
+    offsets = np.sort(rng.integers(0, days, n))
+    dates = pd.Timestamp(end) - pd.to_timedelta(days - 1 - offsets, unit="D")
+    return pd.DataFrame({
+        "Date": dates,
+        "Category": _labels([m[0] for m in MERCHANTS], pick),
+        "Merchant": _labels([m[1] for m in MERCHANTS], pick),
+        "Amount": amount,
+    })
+
+
+def modules(n, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    return pd.DataFrame({
+        "module_id": [f"M{i:06d}" for i in range(n)],
+        "title": [f"Module {i}" for i in range(n)],
+        "type": rng.choice(["core", "external"], n, p=[0.8, 0.2]),
+        "learning_path": rng.choice(PATHS, n),
+        "access_level": rng.choice(LEVELS, n),
+        "exclusive": rng.choice(EXCLUSIVE, n, p=[0.65, 0.35]),
+        "featured": rng.random(n) < 0.1,
+        "topic_area": rng.choice(["budgeting", "investing", "saving", "news"], n),
+        "goal_tags": _tag_lists(rng, GOALS, n, 1, 3),
+        "behavior_triggers": _tag_lists(rng, TRIGGERS, n, 1, 2),
+        "xp_value": rng.integers(10, 80, n),
+        "duration_minutes": rng.integers(2, 15, n),
+        "popularity_score": rng.uniform(5, 10, n).round(1),
+    })
+
+
+def challenges(n, seed=0):
+    rng = np.random.default_rng(seed + 2)
+    achievement = np.asarray(ACHIEVEMENTS, dtype=object)[rng.integers(0, len(ACHIEVEMENTS), n)]
+    achievement[rng.random(n) < 0.6] = None
+    return pd.DataFrame({
+        "challenge_id": [f"CH{i:06d}" for i in range(n)],
+        "challenge_text": [f"Challenge {i}" for i in range(n)],
+        "linked_goal": rng.choice(GOALS, n),
+        "linked_trigger": rng.choice(TRIGGERS, n),
+        "linked_achievement": achievement,
+        "estimated_difficulty": rng.choice(["easy", "medium", "hard"], n),
+        "xp_reward": rng.choice([30, 50, 80], n),
+        "token_reward": rng.integers(1, 4, n),
+    })
+
+
+def users(n, seed=0):
+    rng = np.random.default_rng(seed + 3)
+    return pd.DataFrame({
+        "user_id": [f"U{i:06d}" for i in range(n)],
+        "name": [f"User {i}" for i in range(n)],
+        "level": rng.choice(LEVELS, n),
+        "goal_tags": _tag_lists(rng, GOALS, n, 1, 3),
+        "has_premium": rng.random(n) < 0.2,
+        "token_balance": rng.integers(0, 30, n),
+        "current_path": rng.choice(PATHS, n),
+        "xp_points": rng.integers(0, 2000, n),
+        "streak_days": rng.integers(0, 60, n),
+        "achievements": _tag_lists(rng, ACHIEVEMENTS, n, 1, 3),
+        "date_achievement": "21/06/2025",
+    })
+
+
+def write_csv(frame, path):
+    # pyarrow writes multi-million-row frames far faster than DataFrame.to_csv.
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            # Day-dated like the exports: "2025-03-01", not "2025-03-01 00:00:00".
+            table = table.set_column(i, field.name, table[field.name].cast(pa.date32()))
+    pacsv.write_csv(table, path, pacsv.WriteOptions(quoting_style="needed"))
+
+
+def generate(out, rows, catalog, n_users=1, seed=0):
+    """Write one dataset to ``out`` and return the paths by name."""
+    os.makedirs(out, exist_ok=True)
+    paths = {
+        "transactions": os.path.join(out, f"transactions_{rows}.csv"),
+        "modules": os.path.join(out, f"modules_{catalog}.csv"),
+        "challenges": os.path.join(out, f"challenges_{catalog}.csv"),
+        "users": os.path.join(out, f"users_{n_users}.csv"),
+    }
+    write_csv(transactions(rows, seed), paths["transactions"])
+    write_csv(modules(catalog, seed), paths["modules"])
+    write_csv(challenges(catalog, seed), paths["challenges"])
+    write_csv(users(n_users, seed), paths["users"])
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Centinel dataset.")
+    parser.add_argument("--rows", default="10k", help="transaction rows, e.g. 1k, 1m, 10m")
+    parser.add_argument("--catalog", default="1k", help="modules and challenges each, up to 100k")
+    parser.add_argument("--users", default="1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_data")
+    args = parser.parse_args(argv)
+    paths = generate(args.out, parse_count(args.rows), parse_count(args.catalog), parse_count(args.users), args.seed)
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
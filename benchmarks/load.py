@@ -0,0 +1,343 @@
+"""Load-test one dashboard server with many concurrent sessions.
+
+    python -m benchmarks.load                                  # 10 sessions for 60 s
+    python -m benchmarks.load --sessions 50 --duration 120 --think 2
+    python -m benchmarks.load --out load.json --baseline load_baseline.json
+
+Starts ``streamlit run app.py`` headless on a free port and connects
+``--sessions`` websocket clients to it, speaking the same protocol as the
+browser. Each session reruns the app on a page picked from ``PAGES``,
+sometimes switching to another ``USER_FILES`` user, and then waits for an
+exponentially distributed think time (mean ``--think`` seconds) before the
+next interaction. A rerun's latency runs from sending it to the server's
+``script_finished``, so time spent queued behind other sessions counts.
+
+By default the server runs in a temporary copy of the app and its data
+files, so state, store and profile writes never touch the working tree and
+every run starts cold (``--in-place`` uses the tree as-is). The first rerun
+of each session loads the app and is reported apart from the per-page
+figures.
+
+Results, per page and overall: reruns, p50/p95/p99/max latency, and
+throughput. They also include the server's CPU and RSS, sampled every
+``--sample`` seconds with psutil. Each CPU sample is split evenly between
+the reruns in flight at the time, and a page's RSS is the largest seen
+while one of its reruns was running. With ``--baseline``, pages whose p95
+grew by more than ``--threshold`` (and by more than ``--floor`` seconds)
+are flagged as regressions, and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from benchmarks.startup import PAGES, copy_tree
+from centinel.registry import USER_FILES
+
+try:
+    import psutil
+except ImportError:  # optional: CPU and RSS are left out without it
+    psutil = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# --- Server ---
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _workdir(in_place):
+    if in_place:
+        return ROOT, None
+    scratch = tempfile.mkdtemp(prefix="centinel-load-")
+    return copy_tree(scratch), scratch
+
+
+def start_server(workdir, port):
+    command = [
+        sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+        "--server.port", str(port), "--server.address", "127.0.0.1", "--browser.gatherUsageStats", "false",
+    ]
+    return subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def _connect(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await websockets.connect(
+                f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None,
+            )
+        except (OSError, websockets.InvalidHandshake):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+# --- Sessions ---
+class Session:
+    """One browser tab: reruns the app with chosen widget values."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}  # "radio" (page) / "selectbox" (user) -> widget id
+
+    async def rerun(self, page=None, user=None):
+        """Rerun with ``page`` and ``user`` selected; returns ``(seconds, error)``."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        for kind, value in (("radio", page), ("selectbox", user)):
+            if value is not None and kind in self.widgets:
+                state = msg.rerun_script.widget_states.widgets.add()
+                state.id = self.widgets[kind]
+                state.string_value = value
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        error = None
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await self.ws.recv())
+            kind = reply.WhichOneof("type")
+            if kind == "script_finished":
+                return time.perf_counter() - start, error
+            if kind == "delta" and reply.delta.WhichOneof("type") == "new_element":
+                element = reply.delta.new_element
+                name = element.WhichOneof("type")
+                if name in ("radio", "selectbox"):
+                    self.widgets[name] = getattr(element, name).id
+                elif name == "exception":
+                    error = error or element.exception.message
+
+
+class Recorder:
+    def __init__(self):
+        self.reruns = []  # (page, seconds, error)
+        self.first = []  # seconds of each session's first rerun
+        self.in_flight = {}  # page -> reruns running now
+        self.cpu = {}  # page -> attributed CPU seconds
+        self.rss = {}  # page -> peak RSS bytes
+        self.samples = []  # (t, cpu seconds, rss bytes)
+
+    def begin(self, page):
+        self.in_flight[page] = self.in_flight.get(page, 0) + 1
+
+    def end(self, page, seconds, error):
+        self.in_flight[page] -= 1
+        self.reruns.append((page, seconds, error))
+
+
+async def run_session(port, recorder, rng, deadline, think, switch_user):
+    users = list(USER_FILES)
+    user = rng.choice(users)
+    session = Session(await _connect(port))
+    try:
+        seconds, _ = await session.rerun()
+        recorder.first.append(seconds)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(rng.expovariate(1 / think) if think > 0 else 0)
+            if time.monotonic() >= deadline:
+                break
+            page = rng.choice(PAGES)
+            if rng.random() < switch_user:
+                user = rng.choice(users)
+            recorder.begin(page)
+            seconds, error = await session.rerun(page, user)
+            recorder.end(page, seconds, error)
+    finally:
+        await session.ws.close()
+
+
+async def sample(process, recorder, interval, stop):
+    last = sum(process.cpu_times()[:2])
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        cpu, rss = sum(process.cpu_times()[:2]), process.memory_info().rss
+        recorder.samples.append((time.monotonic(), cpu, rss))
+        running = {page: n for page, n in recorder.in_flight.items() if n}
+        total = sum(running.values())
+        for page, n in running.items():
+            recorder.cpu[page] = recorder.cpu.get(page, 0.0) + (cpu - last) * n / total
+            recorder.rss[page] = max(recorder.rss.get(page, 0), rss)
+        last = cpu
+
+
+async def drive(port, server, sessions, duration, think, switch_user, interval, seed):
+    recorder = Recorder()
+    stop = asyncio.Event()
+    await (await _connect(port)).close()  # wait for the server before timing anything
+    sampler = None
+    if psutil is not None:
+        sampler = asyncio.ensure_future(sample(psutil.Process(server.pid), recorder, interval, stop))
+    start = time.monotonic()
+    deadline = start + duration
+    rng = random.Random(seed)
+    await asyncio.gather(*(
+        run_session(port, recorder, random.Random(rng.random()), deadline, think, switch_user)
+        for _ in range(sessions)
+    ))
+    elapsed = time.monotonic() - start
+    stop.set()
+    if sampler is not None:
+        await sampler
+    return recorder, elapsed
+
+
+# --- Report ---
+def _percentiles(seconds):
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "p50_s": pct(50), "p95_s": pct(95), "p99_s": pct(99), "max_s": ordered[-1],
+        "mean_s": statistics.fmean(ordered),
+    }
+
+
+def summarize(recorder, elapsed, args):
+    pages = {}
+    for page in PAGES:
+        seconds = [s for p, s, _ in recorder.reruns if p == page]
+        if not seconds:
+            continue
+        pages[page] = {
+            "reruns": len(seconds),
+            "errors": sum(1 for p, _, e in recorder.reruns if p == page and e),
+            **_percentiles(seconds),
+            "cpu_s": recorder.cpu.get(page) if psutil is not None else None,
+            "cpu_ms_per_rerun": recorder.cpu[page] * 1000 / len(seconds) if page in recorder.cpu else None,
+            "rss_peak_mb": recorder.rss[page] / 2**20 if page in recorder.rss else None,
+        }
+    all_seconds = [s for _, s, _ in recorder.reruns]
+    overall = {
+        "reruns": len(all_seconds),
+        "errors": sum(1 for *_, e in recorder.reruns if e),
+        "throughput_per_s": len(all_seconds) / elapsed if elapsed else 0.0,
+        **_percentiles(all_seconds),
+        "first_rerun": _percentiles(recorder.first),
+    }
+    if recorder.samples:
+        cpu = recorder.samples[-1][1] - recorder.samples[0][1]
+        span = recorder.samples[-1][0] - recorder.samples[0][0]
+        overall["cpu_percent"] = 100 * cpu / span if span else None
+        overall["rss_start_mb"] = recorder.samples[0][2] / 2**20
+        overall["rss_peak_mb"] = max(s[2] for s in recorder.samples) / 2**20
+        overall["rss_end_mb"] = recorder.samples[-1][2] / 2**20
+    errors = sorted({e for *_, e in recorder.reruns if e})
+    return {
+        "config": {
+            "sessions": args.sessions, "duration_s": args.duration, "think_s": args.think,
+            "switch_user": args.switch_user, "seed": args.seed, "in_place": args.in_place,
+        },
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "elapsed_s": elapsed,
+        "overall": overall,
+        "pages": pages,
+        "error_messages": errors[:10],
+    }
+
+
+def compare(current, baseline, threshold=1.25, floor=0.01):
+    """Rows of ``(page, baseline_p95, current_p95, ratio, regressed)`` for pages in both."""
+    rows = []
+    for page, stats in current["pages"].items():
+        base = baseline.get("pages", {}).get(page)
+        if base is None:
+            continue
+        ratio = stats["p95_s"] / base["p95_s"] if base["p95_s"] else float("inf")
+        regressed = ratio > threshold and stats["p95_s"] - base["p95_s"] > floor
+        rows.append((page, base["p95_s"], stats["p95_s"], ratio, regressed))
+    return rows
+
+
+def _ms(value):
+    return f"{value * 1e3:8.1f}" if value is not None else "       -"
+
+
+def print_report(results, out=sys.stdout):
+    print(f"{'page':<10} {'reruns':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu ms':>8} {'rss MB':>7}", file=out)
+    for page, s in results["pages"].items():
+        cpu = f"{s['cpu_ms_per_rerun']:8.1f}" if s["cpu_ms_per_rerun"] is not None else "       -"
+        rss = f"{s['rss_peak_mb']:7.0f}" if s["rss_peak_mb"] is not None else "      -"
+        print(f"{page:<10} {s['reruns']:>6} {_ms(s['p50_s'])} {_ms(s['p95_s'])} {_ms(s['p99_s'])} {cpu} {rss}", file=out)
+    o = results["overall"]
+    if o["reruns"]:
+        print(
+            f"{'all':<10} {o['reruns']:>6} {_ms(o['p50_s'])} {_ms(o['p95_s'])} {_ms(o['p99_s'])}  "
+            f"{o['throughput_per_s']:.1f} reruns/s, {o['errors']} errors", file=out,
+        )
+    if "cpu_percent" in o:
+        print(f"server CPU {o['cpu_percent']:.0f}%  RSS {o['rss_start_mb']:.0f} -> {o['rss_end_mb']:.0f} MB "
+              f"(peak {o['rss_peak_mb']:.0f})", file=out)
+    if o["first_rerun"]:
+        print(f"first rerun per session: p50 {_ms(o['first_rerun']['p50_s']).strip()} ms, "
+              f"max {_ms(o['first_rerun']['max_s']).strip()} ms", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent sessions.")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent sessions (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load (default: %(default)s)")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between reruns in seconds")
+    parser.add_argument("--switch-user", type=float, default=0.1, help="chance a rerun also switches user")
+    parser.add_argument("--sample", type=float, default=0.25, help="CPU/RSS sampling interval in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-place", action="store_true", help="serve the working tree instead of a copy")
+    parser.add_argument("--out", help="also write the results as JSON")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p95 slowdown ratio counted as a regression")
+    parser.add_argument("--floor", type=float, default=0.01, help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    workdir, scratch = _workdir(args.in_place)
+    port = _free_port()
+    server = start_server(workdir, port)
+    try:
+        recorder, elapsed = asyncio.run(drive(
+            port, server, args.sessions, args.duration, args.think, args.switch_user, args.sample, args.seed,
+        ))
+    finally:
+        server.terminate()
+        server.wait()
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    results = summarize(recorder, elapsed, args)
+    print_report(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if not args.baseline:
+        return 1 if results["overall"]["errors"] else 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results["config"]:
+        print("note: the baseline ran with a different configuration", file=sys.stderr)
+    rows = compare(results, baseline, args.threshold, args.floor)
+    for page, base, current, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{page:<10} p95 {base * 1e3:10.1f} -> {current * 1e3:10.1f} ms  x{ratio:.2f}{flag}")
+    return 1 if results["overall"]["errors"] or any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
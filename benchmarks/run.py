@@ -0,0 +1,214 @@
+"""Time each stage of the analytics pipeline on synthetic data.
+
+    python -m benchmarks.run                                  # 1k, 10k, 100k rows
+    python -m benchmarks.run --sizes 1m,10m --catalog 100k --repeat 3
+    python -m benchmarks.run --out new.json --baseline baseline.json
+
+Each size is generated once (see ``benchmarks.generate``) under ``--data``
+and reused by later runs. Every stage runs ``--repeat`` times and its
+median and best wall time are written as JSON. With ``--baseline``, stages
+whose median grew by more than ``--threshold`` (and by more than
+``--floor`` seconds, to ignore sub-millisecond noise) are reported as
+regressions, and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import generate, parse_count
+from centinel import charts
+from centinel.merchants import add_merchant_flags
+from centinel.recommend import CHALLENGE_FIELDS, MODULE_FIELDS, TagIndex, top_k
+from centinel.rollups import build_rollup
+from centinel.triggers import (
+    PERSISTENCE_WINDOWS, SEVERITY_TRIGGERS, TRIGGERS, build_windows, count_persistence, detect_triggers,
+    rank_triggers, trigger_matrix, trigger_severity,
+)
+from centinel.txstore import convert, read_transactions
+
+DEFAULT_SIZES = "1k,10k,100k"
+
+
+def measure(fn, repeat):
+    """Run ``fn`` ``repeat`` times; returns its last result and the timings."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, {"median_s": statistics.median(times), "min_s": min(times), "runs": repeat}
+
+
+def run_size(paths, repeat, progress=sys.stderr):
+    """Time every stage on one generated dataset."""
+    stages = {}
+
+    def stage(name, fn, rows=None):
+        result, timing = measure(fn, repeat)
+        stages[name] = {**timing, "rows": int(len(result) if rows is None else rows)}
+        print(f"  {name:<20} {timing['median_s'] * 1e3:10.2f} ms", file=progress)
+        return result
+
+    def load():
+        frame = pd.read_csv(paths["transactions"])
+        frame["Date"] = pd.to_datetime(frame["Date"])
+        return frame
+
+    n = len(stage("csv_load", load))
+    modules_df = pd.read_csv(paths["modules"])
+    challenges_df = pd.read_csv(paths["challenges"])
+    user = pd.read_csv(paths["users"]).iloc[0]
+
+    store = tempfile.mkdtemp(prefix="centinel-bench-")
+    try:
+        stage("store_convert", lambda: convert("BENCH", paths["transactions"], root=store), n)
+        df = stage("store_read", lambda: read_transactions("BENCH", root=store), n)
+    finally:
+        shutil.rmtree(store, ignore_errors=True)
+
+    df = stage("merchant_flags", lambda: add_merchant_flags(df), n)
+    today = df["Date"].max()
+    windows = build_windows(today)
+    recent = df[df["Date"] > today - timedelta(days=7)]
+
+    stage("detect_triggers", lambda: detect_triggers(df, modules_df), n)
+    stage("trigger_matrix", lambda: trigger_matrix(df, windows, modules_df), n)
+
+    # Top triggers over the last three weeks: one pass for all of them, as the
+    # dashboard does, next to the original slice-and-detect loop per week.
+    weeks = {name: windows[name] for name in PERSISTENCE_WINDOWS}
+
+    def per_window():
+        counts = {}
+        for start, end, _ in weeks.values():
+            for trig in detect_triggers(df[(df["Date"] >= start) & (df["Date"] < end)], modules_df):
+                counts[trig] = counts.get(trig, 0) + 1
+        return rank_triggers(counts)
+
+    stage("persistence_loop", per_window, n)
+    top = stage("persistence", lambda: rank_triggers(count_persistence(trigger_matrix(df, weeks, modules_df))), n)
+    stage("trigger_severity", lambda: {t: trigger_severity(t, recent) for t in TRIGGERS if t in SEVERITY_TRIGGERS}, len(recent))
+
+    goals = user["goal_tags"].split(";")
+    achievements = set(str(user["achievements"]).split(";"))
+    module_index = stage("module_index", lambda: TagIndex(modules_df, MODULE_FIELDS), len(modules_df))
+    stage("module_scoring", lambda: top_k(module_index.score(goals=goals, triggers=top), 3), len(modules_df))
+    challenge_index = stage(
+        "challenge_index",
+        lambda: TagIndex(challenges_df, CHALLENGE_FIELDS, bias=challenges_df["linked_achievement"].notna()),
+        len(challenges_df),
+    )
+    stage(
+        "challenge_scoring",
+        lambda: top_k(challenge_index.score(goals=goals, triggers=top, achievements=achievements), 2),
+        len(challenges_df),
+    )
+
+    rollup, _ = stage("rollup_build", lambda: build_rollup(df), n)
+    start = today - timedelta(days=6)
+
+    def all_charts():
+        return (
+            charts.week_summary(rollup, start), charts.category_totals(rollup), charts.daily_spend(rollup, start),
+            charts.spend_save_invest(rollup), [charts.behaviour_series(rollup, t) for t in SEVERITY_TRIGGERS],
+        )
+
+    stage("charts", all_charts, len(rollup))
+    return stages
+
+
+def run(sizes, catalog, repeat, data_dir, seed=0, progress=sys.stderr):
+    results = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "runs": {},
+    }
+    for rows in sizes:
+        key = f"{rows}x{catalog}"
+        print(f"{rows} rows, {catalog} modules/challenges", file=progress)
+        paths = _dataset(data_dir, rows, catalog, seed)
+        results["runs"][key] = {"rows": rows, "catalog": catalog, "stages": run_size(paths, repeat, progress)}
+    return results
+
+
+def _dataset(data_dir, rows, catalog, seed):
+    directory = os.path.join(data_dir, f"seed{seed}")
+    paths = {
+        "transactions": os.path.join(directory, f"transactions_{rows}.csv"),
+        "modules": os.path.join(directory, f"modules_{catalog}.csv"),
+        "challenges": os.path.join(directory, f"challenges_{catalog}.csv"),
+        "users": os.path.join(directory, "users_1.csv"),
+    }
+    if not all(os.path.exists(path) for path in paths.values()):
+        generate(directory, rows, catalog, 1, seed)
+    return paths
+
+
+def compare(current, baseline, threshold=1.25, floor=0.001):
+    """Rows of ``(run, stage, baseline_s, current_s, ratio, regressed)`` for stages in both."""
+    rows = []
+    for key, run_ in current["runs"].items():
+        base_run = baseline["runs"].get(key)
+        if base_run is None:
+            continue
+        for name, timing in run_["stages"].items():
+            base = base_run["stages"].get(name)
+            if base is None:
+                continue
+            ratio = timing["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+            regressed = ratio > threshold and timing["median_s"] - base["median_s"] > floor
+            rows.append((key, name, base["median_s"], timing["median_s"], ratio, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Centinel analytics pipeline.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="transaction rows per run (default: %(default)s)")
+    parser.add_argument("--catalog", default="1k", help="modules and challenges each (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", default="bench_data", help="where generated datasets are kept")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    parser.add_argument("--floor", type=float, default=0.001, help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_count(size) for size in args.sizes.split(",")]
+    results = run(sizes, parse_count(args.catalog), args.repeat, args.data, args.seed)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.out}", file=sys.stderr)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold, args.floor)
+    for key, name, base, current, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:<16} {name:<20} {base * 1e3:10.2f} -> {current * 1e3:10.2f} ms  x{ratio:.2f}{flag}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Measure import and first-render cost of the engine and the dashboard.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 10 --out bench_results_startup.json
+
+Every measurement runs in a fresh interpreter, so nothing is already in
+``sys.modules``, inside a fresh temporary copy of the app and its data files
+with every ``CENTINEL_*`` state path pointed into that copy. So each first
+render is cold and the working tree is never written:
+
+- ``imports``: wall time of importing ``centinel.engine``, the dashboard
+  graph, pandas, plotly and streamlit on their own, plus which of the heavy
+  third-party packages each one loaded.
+- ``pages``: for each page, the first render of ``app.py`` (its imports and
+  cold caches) and the median of the reruns after it, which is what an open
+  session pays per interaction. Whether ``plotly.express`` got imported is
+  reported per page (streamlit itself loads parts of ``plotly``).
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Left out of the temporary copies: history, generated data and warm state.
+IGNORE = [".git", ".devcontainer", "bench_data", "benchmarks", ".centinel_*", "__pycache__",
+          "batch_results.json*", "bench_results*.json", "requests.jsonl"]
+# Paths the app writes to or warms up from, relative to its working directory.
+STATE_PATHS = {
+    "CENTINEL_STATE_DIR": ".centinel_state",
+    "CENTINEL_STORE_DIR": ".centinel_store",
+    "CENTINEL_USER_DB": ".centinel_users.db",
+    "CENTINEL_RESULTS": "batch_results.json",
+}
+MODULES = ["centinel.engine", "centinel.dashboard", "pandas", "plotly.express", "streamlit"]
+PAGES = ["Overview", "Analytics", "Modules", "Shop", "Friends", "Profile"]
+HEAVY = ["pandas", "numpy", "pyarrow", "plotly.express", "streamlit", "psutil"]
+
+_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"s": elapsed, "loaded": sorted(p for p in {heavy!r} if p in sys.modules)}}))
+"""
+
+_PAGE = """
+import json, os, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(os.path.abspath("app.py"), default_timeout=120)
+at.session_state["page"] = {page!r}
+times = []
+for _ in range({reruns} + 1):
+    start = time.perf_counter()
+    at.run()
+    times.append(time.perf_counter() - start)
+    if at.exception:
+        raise SystemExit(str(at.exception))
+print(json.dumps({{"first_s": times[0], "reruns_s": times[1:], "plotly": "plotly.express" in sys.modules}}))
+"""
+
+
+def copy_tree(directory):
+    """Copy the app and its data files into ``directory``; returns the copy."""
+    workdir = os.path.join(directory, "app")
+    shutil.copytree(ROOT, workdir, ignore=shutil.ignore_patterns(*IGNORE))
+    return workdir
+
+
+def _python(code):
+    with tempfile.TemporaryDirectory(prefix="centinel-startup-") as scratch:
+        workdir = copy_tree(scratch)
+        env = {**os.environ, **{name: os.path.join(workdir, path) for name, path in STATE_PATHS.items()}}
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_imports(repeat):
+    results = {}
+    for module in MODULES:
+        runs = [_python(_IMPORT.format(module=module, heavy=HEAVY)) for _ in range(repeat)]
+        results[module] = {
+            "median_s": statistics.median(r["s"] for r in runs),
+            "min_s": min(r["s"] for r in runs),
+            "loaded": runs[-1]["loaded"],
+        }
+    return results
+
+
+def measure_pages(repeat, reruns):
+    results = {}
+    for page in PAGES:
+        runs = [_python(_PAGE.format(page=page, reruns=reruns)) for _ in range(repeat)]
+        results[page] = {
+            "first_median_s": statistics.median(r["first_s"] for r in runs),
+            "rerun_median_s": statistics.median(s for r in runs for s in r["reruns_s"]),
+            "plotly": runs[-1]["plotly"],
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Centinel import and cold-start cost.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--reruns", type=int, default=5, help="reruns timed after each first render")
+    parser.add_argument("--skip-pages", action="store_true", help="only time the imports")
+    parser.add_argument("--out", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = {"imports": measure_imports(args.repeat)}
+    for module, r in results["imports"].items():
+        print(f"import {module:<20} {r['median_s'] * 1e3:8.1f} ms  loads {', '.join(r['loaded'])}")
+    if not args.skip_pages:
+        results["pages"] = measure_pages(args.repeat, args.reruns)
+        for page, r in results["pages"].items():
+            print(
+                f"page   {page:<20} first {r['first_median_s'] * 1e3:8.1f} ms  "
+                f"rerun {r['rerun_median_s'] * 1e3:8.1f} ms  plotly {'yes' if r['plotly'] else 'no'}"
+            )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Data and analytics helpers behind the Centinel Streamlit app."""
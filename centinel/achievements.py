@@ -0,0 +1,352 @@
+"""Event-driven achievement unlocking, XP and token rewards.
+
+Rules live in ``achievement_rules.csv``, one per achievement in
+``centinel_achievements_list.csv``. A rule names the event it listens to,
+an optional ``field == value`` filter, how events are measured and the
+threshold that unlocks it:
+
+    count           events seen
+    sum             size of the total of ``measure_field``
+    distinct        distinct values of ``measure_field``
+    value           latest value of ``measure_field`` (profile snapshots)
+    monthly_growth  a month's ``measure_field`` total over the month before's,
+                    best pair so far; only months after a positive total count
+
+An unlock is dated by the row that crossed the threshold. Rules are checked
+after every row, so where a feed is split into chunks does not matter.
+``monthly_growth`` keeps every month's total and compares each calendar
+month with the one before it, so it does not depend on the order months
+arrive in either. It is checked once per chunk, though: a month whose total
+passes the threshold and falls back within one chunk (mixed-sign rows) may
+unlock under one split and not another.
+
+Events are transactions (as rows of the transaction store, with
+``merchant_class``), ``profile`` snapshots, and anything the app reports
+through ``record`` (``module_completed``, ``challenge_completed``,
+``token_spent`` ...). Rules are indexed by event and by filter value, so an
+event only touches the rules that can match it. A batch of transactions
+costs one pass per distinct filter value present in it. Each user's
+running progress is kept in ``.centinel_state/<user>.achievements.json``
+and only grows with new events.
+
+The first refresh for a user, and the one after their export was rewritten,
+only seeds progress from the history already there. Achievements it reaches
+are kept as unlocked but pay nothing and are not written to the profile.
+Unlocks from rows appended after that, and from reported events, are
+appended to the profile's ``achievements``. Their XP and tokens are added
+through the profile write-ahead log.
+"""
+import json
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from centinel.data import file_fingerprint, load_csv
+from centinel.merchants import add_merchant_flags
+from centinel.profiles import profile_log
+from centinel.state import STATE_DIR, write_json
+from centinel.trigger_state import extends, fold_frames
+
+RULES_PATH = "achievement_rules.csv"
+ACHIEVEMENTS_PATH = "centinel_achievements_list.csv"
+PROGRESS_VERSION = 2
+MEASURES = {"count", "sum", "distinct", "value", "monthly_growth"}
+DATE_FORMAT = "%d/%m/%Y"
+
+
+def _month(day):
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def _crossed(levels, threshold):
+    """``(last level, position of the first level reaching threshold or None)``."""
+    reached = np.flatnonzero(levels >= threshold)
+    return float(levels[-1]), int(reached[0]) if len(reached) else None
+
+
+def _unlock_date(rows, position, when):
+    day = rows["Date"].iloc[position] if position is not None and "Date" in rows else None
+    for candidate in (day, when):
+        if candidate is not None and pd.notna(candidate):
+            return candidate.strftime(DATE_FORMAT)
+    return date.today().strftime(DATE_FORMAT)
+
+
+class AchievementEngine:
+    def __init__(self, rules, catalog, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.catalog = catalog
+        rules = rules.dropna(subset=["achievement", "event", "measure"]).fillna({"xp_reward": 0, "token_reward": 0})
+        unknown = set(rules["measure"]) - MEASURES
+        if unknown:
+            raise ValueError(f"unknown achievement measures: {sorted(unknown)}")
+        self.rules = {}
+        # event -> (rules without a filter, {field: {value: [rules]}})
+        self.index = {}
+        for rule in rules.itertuples(index=False):
+            rule = {
+                "id": rule.achievement,
+                "event": rule.event,
+                "field": None if pd.isna(rule.field) else rule.field,
+                "value": None if pd.isna(rule.value) else str(rule.value),
+                "measure": rule.measure,
+                "measure_field": None if pd.isna(rule.measure_field) else rule.measure_field,
+                "threshold": float(rule.threshold),
+                "xp": int(rule.xp_reward),
+                "tokens": int(rule.token_reward),
+            }
+            self.rules[rule["id"]] = rule
+            unfiltered, filtered = self.index.setdefault(rule["event"], ([], {}))
+            if rule["field"] is None:
+                unfiltered.append(rule)
+            else:
+                filtered.setdefault(rule["field"], {}).setdefault(rule["value"], []).append(rule)
+
+    # --- Matching ---
+    def _matches(self, event, frame):
+        """``(rule, rows)`` for every rule ``frame``'s events can advance."""
+        unfiltered, filtered = self.index.get(event, ([], {}))
+        for rule in unfiltered:
+            yield rule, frame
+        for field, by_value in filtered.items():
+            if field not in frame:
+                continue
+            values = frame[field].astype(str)
+            for value in set(values.dropna().unique()) & set(by_value):
+                rows = frame[(values == value).to_numpy()]
+                for rule in by_value[value]:
+                    yield rule, rows
+
+    # --- Measures ---
+    def _advance(self, rule, state, rows):
+        """``(state, level, crossed)``: new state, level after ``rows``, and the
+        position in ``rows`` where the level first reached the threshold."""
+        measure, column, threshold = rule["measure"], rule["measure_field"], rule["threshold"]
+        if measure == "count":
+            levels = (state or 0) + np.arange(1, len(rows) + 1)
+            return int(levels[-1]), *_crossed(levels, threshold)
+        if measure == "sum":
+            # Exports differ in sign conventions, so totals count by size (as in triggers).
+            totals = (state or 0.0) + rows[column].fillna(0).to_numpy(dtype=float).cumsum()
+            return float(totals[-1]), *_crossed(np.abs(totals), threshold)
+        if measure == "distinct":
+            seen = set(state or [])
+            present = np.flatnonzero(rows[column].notna().to_numpy())
+            values = rows[column].iloc[present].astype(str)
+            if values.empty:
+                return state, len(seen), None
+            first = (~values.isin(seen) & ~values.duplicated()).to_numpy()
+            level, reached = _crossed(len(seen) + np.cumsum(first), threshold)
+            seen |= set(values)
+            # Past the threshold the exact set no longer matters.
+            state = sorted(seen)[: int(threshold)]
+            return state, level, None if reached is None else int(present[reached])
+        if measure == "value":
+            level = float(rows[column].iloc[-1])
+            return None, level, len(rows) - 1 if level >= threshold else None
+        return self._monthly_growth(column, threshold, state, rows)
+
+    def _monthly_growth(self, column, threshold, state, rows):
+        # Every month's total is kept (a few bytes a month), so months arriving
+        # out of order or split across chunks add up the same.
+        state = dict(state or {})
+        dated = rows["Date"].notna().to_numpy()
+        months = rows.loc[dated, "Date"].dt.to_period("M").map(_month).to_numpy()
+        for key, amount in rows.loc[dated, column].groupby(months).sum().items():
+            state[key] = state.get(key, 0.0) + float(amount)
+        best, best_month = 0.0, None
+        for key, total in state.items():
+            previous = state.get(_month(pd.Period(key, "M") - 1))
+            # Signed: from -X to +X, or a negative month after a positive one, is no growth.
+            if previous is not None and previous > 0 and total / previous > best:
+                best, best_month = total / previous, key
+        if best < threshold:
+            return state, best, None
+        # Dated by this chunk's last row in the month that grew, else its last row.
+        in_month = np.flatnonzero(dated)[months == best_month]
+        return state, best, int(in_month[-1]) if len(in_month) else len(rows) - 1
+
+    def apply(self, progress, event, frame, when=None):
+        """Feed ``frame`` (one row per event, in order) into ``progress``; returns the newly unlocked ids.
+
+        Unlocks are dated by the crossing row's ``Date``, else ``when``, else today.
+        """
+        unlocked = []
+        for rule, rows in self._matches(event, frame):
+            # len(), not .empty: an event reported without a payload has rows but no columns.
+            if rule["id"] in progress["unlocked"] or not len(rows):
+                continue
+            state, level, crossed = self._advance(rule, progress["rules"].get(rule["id"]), rows)
+            if state is not None:
+                progress["rules"][rule["id"]] = state
+            if crossed is not None:
+                progress["unlocked"][rule["id"]] = _unlock_date(rows, crossed, when)
+                progress["rules"].pop(rule["id"], None)
+                unlocked.append(rule["id"])
+        return unlocked
+
+    def status(self, progress, achievement):
+        """``(level, threshold)`` reached so far, or ``None`` for rules without a count."""
+        rule = self.rules.get(achievement)
+        if rule is None or rule["measure"] in ("value", "monthly_growth"):
+            return None
+        state = progress["rules"].get(achievement)
+        level = len(state or []) if rule["measure"] == "distinct" else abs(state or 0)
+        return level, rule["threshold"]
+
+    def rewards(self, achievement_ids):
+        xp = sum(self.rules[a]["xp"] for a in achievement_ids if a in self.rules)
+        tokens = sum(self.rules[a]["tokens"] for a in achievement_ids if a in self.rules)
+        return xp, tokens
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def default_engine(rules_path=RULES_PATH, catalog_path=ACHIEVEMENTS_PATH):
+    """Engine for the rule and achievement files, rebuilt only when either changes."""
+    fingerprint = (file_fingerprint(rules_path), file_fingerprint(catalog_path))
+    with _engines_lock:
+        engine = _engines.get((rules_path, catalog_path))
+        if engine is not None and engine.fingerprint == fingerprint:
+            return engine
+    catalog = pd.read_csv(catalog_path, skipinitialspace=True)
+    catalog["category"] = catalog["category"].str.strip()
+    catalog["description"] = catalog["description"].str.strip()
+    engine = AchievementEngine(load_csv(rules_path), catalog, fingerprint)
+    with _engines_lock:
+        _engines[(rules_path, catalog_path)] = engine
+    return engine
+
+
+# --- Per-user progress ---
+def _progress_path(user_id):
+    return os.path.join(STATE_DIR, f"{user_id}.achievements.json")
+
+
+def _empty_progress():
+    # ``seeded``: the history present at the first refresh has been folded in
+    # without rewards; only what arrives after it pays.
+    return {"version": PROGRESS_VERSION, "rows": 0, "tail_hash": None, "seeded": False, "unlocked": {}, "rules": {}}
+
+
+def load_progress(user_id):
+    path = _progress_path(user_id)
+    if not os.path.exists(path):
+        return _empty_progress()
+    with open(path) as f:
+        progress = json.load(f)
+    return progress if progress.get("version") == PROGRESS_VERSION else _empty_progress()
+
+
+def save_progress(user_id, progress):
+    write_json(_progress_path(user_id), progress)
+
+
+def _split(value):
+    return [] if pd.isna(value) or value == "" else str(value).split(";")
+
+
+def _start(progress, profile):
+    # Achievements already on the profile never unlock (or pay out) again.
+    dates = _split(profile.get("date_achievement"))
+    for i, achievement in enumerate(_split(profile["achievements"])):
+        progress["unlocked"].setdefault(achievement, dates[i] if i < len(dates) else "")
+    return progress
+
+
+def _snapshot(profile, xp, tokens):
+    return pd.DataFrame([{
+        "xp_points": (profile["xp_points"] or 0) + xp,
+        "token_balance": (profile["token_balance"] or 0) + tokens,
+        "streak_days": profile["streak_days"] or 0,
+    }])
+
+
+def _settle(engine, progress, profile, unlocked, paying=True):
+    """Re-check the profile rules as rewards land; returns ``(unlocked, xp, tokens)``."""
+    xp, tokens = engine.rewards(unlocked) if paying else (0, 0)
+    while True:
+        more = engine.apply(progress, "profile", _snapshot(profile, xp, tokens))
+        if not more:
+            return unlocked, xp, tokens
+        unlocked = unlocked + more
+        if paying:
+            xp, tokens = engine.rewards(unlocked)
+
+
+def _award(user_id, profile, progress, unlocked, xp, tokens, log=None):
+    if not unlocked:
+        return
+    log = log or profile_log()
+    names = _split(profile["achievements"])
+    dates = _split(profile.get("date_achievement"))
+    dates += [""] * (len(names) - len(dates))
+    for achievement in unlocked:
+        if achievement not in names:
+            names.append(achievement)
+            dates.append(progress["unlocked"][achievement])
+    log.update(user_id, achievements=";".join(names), date_achievement=";".join(dates))
+    if xp or tokens:
+        log.increment(user_id, xp_points=xp, token_balance=tokens)
+
+
+_lock = threading.Lock()
+
+
+def record(user_id, event, profile, when=None, log=None, **payload):
+    """Report one ``event`` for ``user_id``; returns the achievements it unlocked.
+
+    Rewards go through ``log`` (the process-wide profile log by default).
+    """
+    engine = default_engine()
+    with _lock:
+        progress = _start(load_progress(user_id), profile)
+        if not progress["seeded"]:
+            # Profile rules met before any refresh were earned before tracking: no payout.
+            engine.apply(progress, "profile", _snapshot(profile, 0, 0), when)
+        unlocked = engine.apply(progress, event, pd.DataFrame([payload]), when)
+        unlocked, xp, tokens = _settle(engine, progress, profile, unlocked)
+        save_progress(user_id, progress)
+    _award(user_id, profile, progress, unlocked, xp, tokens, log)
+    return unlocked
+
+
+def refresh_achievements(user_id, profile, load_frames, version, log=None):
+    """Bring ``user_id``'s progress up to date with their transactions and profile.
+
+    Like ``trigger_state.refresh_state``: only rows appended since the last
+    refresh are read from ``load_frames``, and only when ``version`` changed.
+    The first refresh (and the one after a rewritten export) seeds progress
+    without paying anything, so viewing a page never changes the profile
+    for history it already had. Returns the progress (``unlocked`` maps
+    achievement to date).
+    """
+    engine = default_engine()
+    with _lock:
+        progress = _start(load_progress(user_id), profile)
+        unlocked = []
+        changed = progress.get("source_version") != version
+        if changed and not extends(progress, load_frames):
+            # A rewritten export restarts the counts and is seeded again; unlocks are kept.
+            progress.update(rows=0, tail_hash=None, seeded=False, rules={})
+        paying = progress["seeded"]
+        if changed:
+            def fold(frame):
+                unlocked.extend(engine.apply(progress, "transaction", add_merchant_flags(frame)))
+
+            rows, tail_hash = fold_frames(load_frames, progress["rows"], fold)
+            if tail_hash is not None:
+                progress["rows"], progress["tail_hash"] = rows, tail_hash
+            progress["source_version"] = version
+        unlocked, xp, tokens = _settle(engine, progress, profile, unlocked, paying)
+        progress["seeded"] = True
+        if changed or unlocked or not paying:
+            save_progress(user_id, progress)
+    if paying:
+        _award(user_id, profile, progress, unlocked, xp, tokens, log)
+    return progress
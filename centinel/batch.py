@@ -0,0 +1,176 @@
+"""Offline precompute of per-user analytics across a process pool.
+
+    python -m centinel.batch                      # users in USER_FILES
+    python -m centinel.batch --registry users/    # one folder per user
+    python -m centinel.batch --workers 8 --out batch_results.json
+
+Each user is run through the same dashboard graph as app.py (triggers,
+persistence, best trigger, top modules and challenges). Finished users are
+appended to ``<out>.partial`` as they complete, so a crashed run resumes where
+it stopped. The final results file is written atomically. Entries carry the
+fingerprints of the inputs they were computed from, and the dashboard only
+uses an entry while those inputs are unchanged.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from centinel.data import file_fingerprint, load_csv
+from centinel.engine import analyze
+from centinel.recommend import challenge_index, module_index
+from centinel.registry import load_registry
+from centinel.results import inputs_fingerprint
+from centinel.state import write_json
+
+RESULTS_PATH = os.environ.get("CENTINEL_RESULTS", "batch_results.json")
+
+
+def _ranked_rows(ranked):
+    return [[int(row), int(score)] for row, score in zip(ranked.index, ranked["score"])]
+
+
+def _from_rows(catalog, rows):
+    rows, scores = zip(*rows) if rows else ((), ())
+    return catalog.iloc[list(rows)].assign(score=list(scores))
+
+
+def summarize_user(user_id, files):
+    """Compute one user's precomputed dashboard values."""
+    user = load_csv(files["user"]).iloc[0]
+    inputs = inputs_fingerprint(user, files)
+    run = analyze(
+        user_id, "persistence", "top_triggers", "best_trigger", "top_modules", "top_challenges",
+        user=user, transactions_path=files["transactions"],
+    )
+    return {
+        "user_id": user_id,
+        "inputs": inputs,
+        "persistence": run["persistence"],
+        "top_triggers": run["top_triggers"],
+        "best_trigger": run["best_trigger"],
+        # Catalog rows rather than ids: module ids are not unique in modules.csv.
+        "top_modules": _ranked_rows(run["top_modules"]),
+        "top_challenges": _ranked_rows(run["top_challenges"]),
+    }
+
+
+def _read_checkpoint(path):
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn last line from a crash
+                done[entry["user_id"]] = entry
+    return done
+
+
+def _write_results(path, entries):
+    write_json(path, {"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "users": entries}, separators=(",", ":"))
+
+
+def run_batch(registry, out=RESULTS_PATH, workers=None, fresh=False, progress=sys.stderr):
+    """Summarize every user in ``registry`` and write ``out``; returns throughput stats."""
+    checkpoint = f"{out}.partial"
+    if fresh and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    # Checkpointed users whose inputs changed since are computed again.
+    done = {}
+    for uid, entry in _read_checkpoint(checkpoint).items():
+        files = registry.get(uid)
+        if files is not None and entry["inputs"] == inputs_fingerprint(load_csv(files["user"]).iloc[0], files):
+            done[uid] = entry
+    todo = {uid: files for uid, files in registry.items() if uid not in done}
+    print(f"{len(registry)} users, {len(done)} already done, {len(todo)} to compute", file=progress)
+
+    start = time.perf_counter()
+    failed = {}
+    with open(checkpoint, "a") as log, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(summarize_user, uid, files): uid for uid, files in todo.items()}
+        for count, future in enumerate(as_completed(futures), 1):
+            uid = futures[future]
+            try:
+                entry = future.result()
+            except Exception as exc:
+                failed[uid] = repr(exc)
+                continue
+            done[uid] = entry
+            log.write(json.dumps(entry) + "\n")
+            log.flush()
+            if count % 100 == 0 or count == len(todo):
+                rate = count / (time.perf_counter() - start)
+                print(f"[{count}/{len(todo)}] {rate:.1f} users/s", file=progress)
+
+    elapsed = time.perf_counter() - start
+    _write_results(out, {uid: done[uid] for uid in registry if uid in done})
+    if not failed:
+        os.remove(checkpoint)
+    stats = {
+        "users": len(todo) - len(failed),
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "users_per_second": round((len(todo) - len(failed)) / elapsed, 2) if elapsed else None,
+    }
+    print(f"done: {stats['users']} users in {stats['seconds']}s ({stats['users_per_second']} users/s), "
+          f"{len(failed)} failed", file=progress)
+    return stats
+
+
+# --- Reading results from the dashboard ---
+_results = {}
+_lock = threading.Lock()
+
+
+def _load_results(path):
+    fingerprint = file_fingerprint(path)
+    with _lock:
+        cached = _results.get(fingerprint[0])
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+    with open(path) as f:
+        results = json.load(f)
+    with _lock:
+        _results[fingerprint[0]] = (fingerprint, results)
+    return results
+
+
+def load_precomputed(user_id, user, files, path=RESULTS_PATH):
+    """Graph seed values for ``user_id`` from the batch results, if still fresh.
+
+    ``user`` is the profile the dashboard is showing. Returns ``{}`` when
+    there is no results file, no entry for the user, or any input changed
+    since the batch ran.
+    """
+    if not os.path.exists(path):
+        return {}
+    entry = _load_results(path)["users"].get(user_id)
+    if entry is None or entry["inputs"] != inputs_fingerprint(user, files):
+        return {}
+    return {
+        "persistence": dict(entry["persistence"]),
+        "top_triggers": list(entry["top_triggers"]),
+        "best_trigger": entry["best_trigger"],
+        "top_modules": _from_rows(module_index().catalog, entry["top_modules"]),
+        "top_challenges": _from_rows(challenge_index().catalog, entry["top_challenges"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute dashboard analytics for every user.")
+    parser.add_argument("--registry", help="directory with one folder per user (default: USER_FILES)")
+    parser.add_argument("--out", default=RESULTS_PATH, help="results file (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--fresh", action="store_true", help="ignore any checkpoint from an earlier run")
+    args = parser.parse_args(argv)
+    stats = run_batch(load_registry(args.registry), args.out, args.workers, args.fresh)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
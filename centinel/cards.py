@@ -0,0 +1,137 @@
+"""HTML card grids for the Modules, Friends and Shop pages.
+
+    html = card_grid(module_cards(sections["remaining"]), columns=3)
+    st.markdown(html, unsafe_allow_html=True)
+
+Card fragments are built for a whole frame at once with pandas string
+operations instead of one f-string per ``iterrows`` row. Each fragment is
+cached under a hash of the row's content, so a rerun only builds cards
+whose rows changed. Every text value is HTML-escaped: names, titles and
+achievements come from user-editable CSVs and profiles. ``card_grid`` joins
+the fragments into a single CSS grid element, so a section costs one
+Streamlit element however many cards it holds.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_FRAGMENTS = 4096
+MODULES_PER_PAGE = 12  # "Explore More Modules" page size: four rows of three
+
+# --- Color map by path (green variations), override for premium and external
+PATH_COLORS = {
+    "Budgeting Basics": "#6ee7b7",
+    "Financial Resilience": "#34d399",
+    "Investing Starters": "#059669",
+    "external": "#6b21a8",
+}
+DEFAULT_PATH_COLOR = "#34d399"
+PREMIUM_COLOR = "#fbbf24"  # gold
+
+MODULE_COLUMNS = ["title", "learning_path", "access_level", "exclusive", "xp_value", "duration_minutes", "popularity_score"]
+FRIEND_COLUMNS = ["name", "streak_days", "xp_points", "achievements"]
+BUNDLE_COLUMNS = ["tokens", "price"]
+
+_fragments = OrderedDict()  # (kind, row hash) -> html
+_lock = threading.Lock()
+# html.escape's replacements, "&" first, applied to whole columns at once.
+_ESCAPES = [("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")]
+
+
+def _text(column):
+    """``column`` as HTML-escaped strings; change case before, not after."""
+    text = column.astype(str)
+    for char, entity in _ESCAPES:
+        text = text.str.replace(char, entity, regex=False)
+    return text
+
+
+def _cached(kind, frame, columns, build):
+    """One fragment per row of ``frame``, building only rows not seen before."""
+    if frame.empty:
+        return []
+    hashes = pd.util.hash_pandas_object(frame[columns], index=False).to_numpy()
+    with _lock:
+        html = [_fragments.get((kind, h)) for h in hashes]
+        for h, fragment in zip(hashes, html):
+            if fragment is not None:
+                _fragments.move_to_end((kind, h))
+    missing = [i for i, fragment in enumerate(html) if fragment is None]
+    if missing:
+        built = build(frame.iloc[missing]).tolist()
+        with _lock:
+            for i, fragment in zip(missing, built):
+                html[i] = fragment
+                _fragments[(kind, hashes[i])] = fragment
+            while len(_fragments) > MAX_FRAGMENTS:
+                _fragments.popitem(last=False)
+    return html
+
+
+# --- Builders (whole frame in one pass) ---
+def _build_modules(df):
+    premium = (df["exclusive"] == "premium_or_token").to_numpy()
+    color = df["learning_path"].map(PATH_COLORS).fillna(DEFAULT_PATH_COLOR).where(~premium, PREMIUM_COLOR)
+    lock = pd.Series(np.where(premium, " 🔒", ""), index=df.index)
+    return (
+        "<div style='border-left: 6px solid " + color + "; padding: 1rem 1rem 1rem 1.5rem; background-color: #f9fafb; "
+        "border-radius: 12px; margin: 0.5rem; color: #111827;'>"
+        "<h4 style='margin-bottom: 0.5rem;'>" + _text(df["title"]) + lock + "</h4>"
+        "<p style='margin: 0.2rem 0;'><strong>Path:</strong> " + _text(df["learning_path"].astype(str).str.title())
+        + " | <strong>Level:</strong> " + _text(df["access_level"].astype(str).str.capitalize()) + "</p>"
+        "<p style='margin: 0.2rem 0;'><strong>XP:</strong> " + _text(df["xp_value"])
+        + " | <strong>Time:</strong> " + _text(df["duration_minutes"])
+        + " min | <strong>Popularity:</strong> " + df["popularity_score"].map("{:.1f}".format) + "</p>"
+        "</div>"
+    )
+
+
+def _build_friends(df):
+    latest = df["achievements"].fillna("").astype(str).str.split(";").str[-1]
+    return (
+        "<div style='border-left: 6px solid #4ade80; background-color: #f0fdf4; padding: 1rem 1.5rem; "
+        "border-radius: 10px; margin-bottom: 1rem; color: #111827;'>"
+        "<h4>" + _text(df["name"]) + "</h4>"
+        "<p><strong>Streak:</strong> " + _text(df["streak_days"]) + " days</p>"
+        "<p><strong>XP:</strong> " + _text(df["xp_points"]) + "</p>"
+        "<p><strong>Latest Achievement:</strong> " + _text(latest.str.replace("_", " ").str.capitalize()) + "</p>"
+        "</div>"
+    )
+
+
+def _build_bundles(df):
+    return (
+        "<div style='border: 2px solid #38bdf8; border-radius: 12px; padding: 1rem; background-color: #f0f9ff; color: #0f172a;'>"
+        "<h4> " + _text(df["tokens"]) + " Tokens</h4>"
+        "<p style='margin: 0.2rem 0;'><strong>Price:</strong> €" + df["price"].map("{:.2f}".format) + "</p>"
+        "<button disabled style='padding: 0.4rem 1rem; background-color: #0ea5e9; color: white; border: none; "
+        "border-radius: 6px; cursor: not-allowed;'>Buy Now</button>"
+        "</div>"
+    )
+
+
+# --- Public API ---
+def module_cards(df):
+    """Card HTML for each catalog row of ``df``, in order."""
+    return _cached("module", df, MODULE_COLUMNS, _build_modules)
+
+
+def friend_cards(friends):
+    """Card HTML for each profile dict (or row) in ``friends``."""
+    return _cached("friend", pd.DataFrame(friends, columns=FRIEND_COLUMNS), FRIEND_COLUMNS, _build_friends)
+
+
+def bundle_cards(bundles):
+    """Card HTML for each token bundle (``tokens``, ``price``)."""
+    return _cached("bundle", pd.DataFrame(bundles, columns=BUNDLE_COLUMNS), BUNDLE_COLUMNS, _build_bundles)
+
+
+def card_grid(fragments, columns=3, gap="1rem"):
+    """The fragments laid out ``columns`` per row, as one HTML element."""
+    return (
+        f"<div style='display: grid; grid-template-columns: repeat({columns}, minmax(0, 1fr)); gap: {gap};'>"
+        + "".join(fragments) + "</div>"
+    )
+
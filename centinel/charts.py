@@ -0,0 +1,64 @@
+"""Aggregations behind the dashboard charts (plotting stays in app.py).
+
+Every function reads a user's rollup (see ``centinel.rollups``) rather than
+the raw transactions. Charts over the whole history are bucketed to keep
+their point count bounded.
+"""
+import pandas as pd
+
+from centinel.rollups import bucket, resolution, window
+
+SAVING_CATEGORIES = ["Savings", "Investments"]
+# trigger -> (rows to keep, value to sum, take the absolute value)
+BEHAVIOUR_SERIES = {
+    "high_spending": (lambda r: r["spend_rows"] > 0, "spend", True),
+    "low_savings": (lambda r: r["category"] == "Savings", "amount", False),
+    "frequent_withdrawals": (lambda r: r["withdrawal_rows"] > 0, "withdrawal_rows", False),
+    "subscription_overlap": (lambda r: r["category"] == "Subscriptions", "amount", False),
+    "new_investment_activity": (lambda r: r["category"] == "Investments", "amount", False),
+}
+
+
+def week_summary(rollup, start):
+    """Net total and the three most negative categories since ``start``."""
+    recent = window(rollup, start)
+    weekly_total = recent["amount"].sum()
+    top_cats = recent.groupby("category")["amount"].sum().sort_values().head(3).rename_axis("Category")
+    return weekly_total, top_cats
+
+
+def category_totals(rollup):
+    spending = rollup[rollup["spend_rows"] > 0]
+    totals = spending.groupby("category")["spend"].sum().abs()
+    return totals.rename_axis("Category").reset_index(name="Amount")
+
+
+def daily_spend(rollup, start):
+    recent = window(rollup, start)
+    spending = recent[recent["spend_rows"] > 0]
+    totals = spending.groupby(spending["day"].dt.date)["spend"].sum().abs()
+    return totals.rename_axis("Date").reset_index(name="Amount")
+
+
+def spend_save_invest(rollup, freq=None):
+    saving = rollup["category"].isin(SAVING_CATEGORIES)
+    spend = rollup[~saving & (rollup["spend_rows"] > 0)]
+    parts = pd.concat([
+        pd.DataFrame({"day": spend["day"], "Type": "Spend", "Amount": spend["spend"]}),
+        pd.DataFrame({"day": rollup.loc[saving, "day"], "Type": rollup.loc[saving, "category"], "Amount": rollup.loc[saving, "amount"]}),
+    ])
+    parts["Day"] = bucket(parts["day"], freq or resolution(parts["day"]))
+    ratios = parts.groupby(["Day", "Type"])["Amount"].sum().abs().reset_index()
+    return ratios.pivot(index="Day", columns="Type", values="Amount").fillna(0).sort_index()
+
+
+def behaviour_series(rollup, trigger, freq=None):
+    if trigger not in BEHAVIOUR_SERIES:
+        return pd.DataFrame()
+    keep, value, absolute = BEHAVIOUR_SERIES[trigger]
+    rows = rollup[keep(rollup).to_numpy(dtype=bool)]
+    days = bucket(rows["day"], freq or resolution(rows["day"]))
+    series = rows.groupby(days)[value].sum()
+    if absolute:
+        series = series.abs()
+    return series.rename_axis("Day").reset_index(name="Amount")
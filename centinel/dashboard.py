@@ -0,0 +1,163 @@
+"""The dashboard's derived values, declared as nodes of one computation graph.
+
+Open a run per rerun with the selected user's inputs::
+
+    run = graph.run(user_id="U001", transactions_path="fake_transactions.csv", user=user)
+    run["top_triggers"]
+
+Only the nodes a page reads (and their dependencies) are computed. The
+``shared`` nodes are per-user results every session can reuse; pass
+``cache=result_cache(), scope=(user_id, data_version(user, files))`` to the
+run to share them across sessions.
+"""
+from datetime import timedelta
+from functools import partial
+
+from centinel import charts
+from centinel.achievements import refresh_achievements
+from centinel.data import load_csv
+from centinel.graph import Graph
+from centinel.merchants import add_merchant_flags, default_classifier
+from centinel.ranges import refresh_index
+from centinel.recommend import challenge_index, module_index, top_k
+from centinel.rollups import refresh_rollup
+from centinel.trigger_state import refresh_state, state_matrix
+from centinel.triggers import build_windows, count_persistence, newly_active_triggers, pick_best_trigger, rank_triggers
+from centinel.txstore import file_dates, iter_transactions, max_date, read_transactions, sync_user
+
+graph = Graph()
+
+
+# --- Inputs derived from the profile and catalogs ---
+@graph.node("user")
+def goals(user):
+    return user["goal_tags"].split(";")
+
+
+@graph.node("user")
+def achievements(user):
+    return set(user["achievements"].split(";"))
+
+
+@graph.node()
+def modules_df():
+    return load_csv("modules.csv")
+
+
+# --- Transactions and windows ---
+@graph.node("user_id", "transactions_path")
+def tx_manifest(user_id, transactions_path):
+    return sync_user(user_id, transactions_path)
+
+
+@graph.node("tx_manifest")
+def today(tx_manifest):
+    return max_date(tx_manifest)
+
+
+@graph.node("today")
+def windows(today):
+    return build_windows(today)
+
+
+@graph.node("user_id", "tx_manifest", "today")
+def recent_transactions(user_id, tx_manifest, today):
+    # Last 7 days, i.e. Date > today - 7 for day-dated rows.
+    return add_merchant_flags(read_transactions(user_id, start=today - timedelta(days=6)))
+
+
+@graph.node("user_id", "tx_manifest")
+def rollup(user_id, tx_manifest):
+    return refresh_rollup(user_id, partial(iter_transactions, user_id), tx_manifest["source"])
+
+
+# --- Triggers ---
+@graph.node("user_id", "tx_manifest", "windows", "modules_df")
+def trigger_windows(user_id, tx_manifest, windows, modules_df):
+    state = refresh_state(user_id, partial(iter_transactions, user_id), tx_manifest["source"])
+    return state_matrix(state, windows, modules_df)
+
+
+@graph.node("trigger_windows", shared=True)
+def persistence(trigger_windows):
+    return count_persistence(trigger_windows)
+
+
+@graph.node("persistence", shared=True)
+def top_triggers(persistence):
+    return rank_triggers(persistence)
+
+
+@graph.node("trigger_windows", "top_triggers", "recent_transactions", shared=True)
+def best_trigger(trigger_windows, top_triggers, recent_transactions):
+    return pick_best_trigger(newly_active_triggers(trigger_windows), top_triggers, recent_transactions)
+
+
+# --- Recommendations ---
+@graph.node("goals", "top_triggers")
+def module_scores(goals, top_triggers):
+    return module_index().score(goals=goals, triggers=top_triggers)
+
+
+@graph.node("module_scores", shared=True)
+def top_modules(module_scores):
+    catalog = module_index().catalog
+    positions = top_k(module_scores, 3)
+    return catalog.iloc[positions].assign(score=module_scores[positions])
+
+
+@graph.node("goals", "top_triggers", "achievements")
+def challenge_scores(goals, top_triggers, achievements):
+    return challenge_index().score(goals=goals, triggers=top_triggers, achievements=achievements)
+
+
+@graph.node("challenge_scores", shared=True)
+def top_challenges(challenge_scores):
+    catalog = challenge_index().catalog
+    positions = top_k(challenge_scores, 2)
+    return catalog.iloc[positions].assign(score=challenge_scores[positions])
+
+
+@graph.node("modules_df", "user")
+def path_next_module(modules_df, user):
+    path_modules = modules_df[modules_df["learning_path"] == user["current_path"]]
+    return path_modules.sort_values("module_id").head(1)
+
+
+# --- Chart aggregates ---
+@graph.node("user_id", "tx_manifest", "rollup")
+def day_index(user_id, tx_manifest, rollup):
+    # Prefix sums for the Analytics date-range control; extended, not rebuilt, as days are appended.
+    key = (tx_manifest["source"], list(default_classifier().fingerprint))
+    return refresh_index(user_id, rollup, key, file_dates(tx_manifest))
+
+
+@graph.node("rollup", "today")
+def week_summary(rollup, today):
+    return charts.week_summary(rollup, today - timedelta(days=6))
+
+
+@graph.node("rollup")
+def category_totals(rollup):
+    return charts.category_totals(rollup)
+
+
+@graph.node("rollup", "today")
+def daily_spend(rollup, today):
+    return charts.daily_spend(rollup, today - timedelta(days=6))
+
+
+@graph.node("rollup")
+def spend_save_invest(rollup):
+    return charts.spend_save_invest(rollup)
+
+
+@graph.node("rollup", "best_trigger")
+def behaviour_series(rollup, best_trigger):
+    return charts.behaviour_series(rollup, best_trigger)
+
+
+# --- Achievements ---
+@graph.node("user_id", "user", "tx_manifest")
+def achievement_progress(user_id, user, tx_manifest):
+    return refresh_achievements(user_id, user, partial(iter_transactions, user_id), tx_manifest["source"])
@@ -0,0 +1,103 @@
+"""Cached CSV loading shared by every page of the dashboard.
+
+Each file is parsed once and kept under a key built from its path, mtime and
+size, so a Streamlit rerun only pays for a ``stat`` call. Entries are evicted
+least-recently-used first once the cache grows past its byte budget, or when
+the machine runs low on free memory.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+CACHE_BUDGET_BYTES = int(os.environ.get("CENTINEL_CACHE_MB", "256")) * 1024 * 1024
+MIN_AVAILABLE_BYTES = int(os.environ.get("CENTINEL_MIN_FREE_MB", "128")) * 1024 * 1024
+
+_cache = OrderedDict()  # (path, parse_dates) -> (fingerprint, frame, nbytes)
+_cache_bytes = 0
+_lock = threading.Lock()
+_psutil = None  # imported on the first eviction check; False when not installed
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def _copy_on_write():
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def handout(frame):
+    """A copy of a cached ``frame`` whose writes never reach the cached one."""
+    # With copy-on-write a shallow copy is enough: any write through it copies
+    # the touched columns instead of changing the cached frame.
+    return frame.copy(deep=not _copy_on_write())
+
+
+def _low_memory():
+    global _psutil
+    if _psutil is None:
+        try:
+            import psutil
+        except ImportError:  # optional: only used to react to system memory pressure
+            psutil = False
+        _psutil = psutil
+    return _psutil is not False and _psutil.virtual_memory().available < MIN_AVAILABLE_BYTES
+
+
+def _evict(keep):
+    global _cache_bytes
+    while len(_cache) > 1 and (_cache_bytes > CACHE_BUDGET_BYTES or _low_memory()):
+        key = next(iter(_cache))
+        if key == keep:
+            _cache.move_to_end(key)
+            key = next(iter(_cache))
+        _, _, nbytes = _cache.pop(key)
+        _cache_bytes -= nbytes
+
+
+def load_csv(path, parse_dates=()):
+    """Return the parsed CSV at ``path``, reading it only if it changed on disk.
+
+    Columns listed in ``parse_dates`` are converted with ``pd.to_datetime``.
+    The returned frame is private to the caller; mutating it never affects
+    the cached copy.
+    """
+    global _cache_bytes
+    key = (os.path.abspath(path), tuple(parse_dates))
+    fingerprint = file_fingerprint(path)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            _cache.move_to_end(key)
+            return handout(entry[1])
+
+    frame = pd.read_csv(path)
+    for col in parse_dates:
+        frame[col] = pd.to_datetime(frame[col])
+    nbytes = int(frame.memory_usage(deep=True).sum())
+
+    with _lock:
+        stale = _cache.pop(key, None)
+        if stale is not None:
+            _cache_bytes -= stale[2]
+        _cache[key] = (fingerprint, frame, nbytes)
+        _cache_bytes += nbytes
+        _evict(keep=key)
+    return handout(frame)
+
+
+def cache_info():
+    with _lock:
+        return {"entries": len(_cache), "bytes": _cache_bytes, "budget": CACHE_BUDGET_BYTES}
+
+
+def clear_cache():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
@@ -0,0 +1,96 @@
+"""The dashboard's analytics as plain functions, without Streamlit or plotly.
+
+    from centinel.engine import analyze, advice
+    values = analyze("U001", "top_triggers", "top_modules")
+    advice(values["top_triggers"])
+
+Importing this module loads pandas, whatever pandas itself imports (numpy,
+python-dateutil and, when installed, pyarrow with its own dependencies such
+as cloudpickle and six), and the small ``centinel.data``, ``recommend`` and
+``registry`` modules. Streamlit, plotly, SQLite, the computation graph, the
+transaction store and the profile sources are imported on the first
+``analyze`` call at the earliest, so batch jobs and scripts pay for what
+they run.
+"""
+import pandas as pd
+
+from centinel.data import load_csv
+from centinel.recommend import top_k
+from centinel.registry import USER_FILES
+
+# --- Advice ---
+TRIGGER_ADVICE = {
+    "high_spending": ["Try limiting non-essential categories for a week."],
+    "low_savings": ["Boost your savings — even small, regular transfers add up over time."],
+    "crypto_interest": ["Crypto detected — just make sure it fits your long-term plan."],
+    "frequent_withdrawals": ["Frequent withdrawals may signal poor planning. Try setting weekly limits."],
+    "no_budgeting_history": ["No budgeting history — start simple with a 50/30/20 method."],
+    "new_investment_activity": ["New investment detected — diversify gradually if you're just starting out."],
+    "unstable_income": ["Your income looks inconsistent. Try building a savings buffer."],
+    "subscription_overlap": ["Multiple subscriptions overlap — consider cancelling one unused service."],
+}
+
+
+def advice(triggers):
+    """The first tip for each trigger that has one, in trigger order."""
+    return [TRIGGER_ADVICE[t][0] for t in triggers if TRIGGER_ADVICE.get(t)]
+
+
+# --- Challenges ---
+COMMUNITY_CHALLENGE = {
+    "challenge_id": "COMM002",
+    "challenge_text": "Log into the app every day this week.",
+    "linked_goal": "",
+    "linked_trigger": "",
+    "linked_achievement": "",
+    "estimated_difficulty": "hard",
+    "xp_reward": 80,
+    "token_reward": 3,
+}
+
+
+# --- Module catalog sections ---
+DIFFICULTY_ORDER = ["beginner", "intermediate", "advanced"]
+
+
+def module_sections(modules_df, scores):
+    """Split the catalog into the Modules page sections.
+
+    Returns ``{"next": ..., "featured": ..., "recommended": ..., "remaining": ...}``,
+    each a frame of catalog rows with a ``score`` column. ``remaining`` holds
+    every module not shown above it, easiest first.
+    """
+    modules_df = modules_df.copy()
+    modules_df["learning_path"] = modules_df["learning_path"].fillna("external")
+    modules_df["score"] = scores
+    modules_df["access_level"] = pd.Categorical(
+        modules_df["access_level"].str.lower().fillna("beginner"), categories=DIFFICULTY_ORDER, ordered=True
+    )
+
+    core_modules = modules_df[modules_df["learning_path"] != "external"]
+    current_path = core_modules["learning_path"].iloc[0] if not core_modules.empty else ""
+    next_module = core_modules[core_modules["learning_path"] == current_path].sort_values("module_id").head(1)
+    featured = modules_df[modules_df["featured"] == True]
+    recommended = modules_df.iloc[top_k(modules_df["score"], 5, min_score=1)]
+    remaining = modules_df[~modules_df.index.isin(
+        next_module.index.union(featured.index).union(recommended.index)
+    )].sort_values("access_level")
+    return {"next": next_module, "featured": featured, "recommended": recommended, "remaining": remaining}
+
+
+# --- Graph values ---
+def analyze(user_id, *nodes, user=None, transactions_path=None, **seeded):
+    """Compute ``nodes`` of the dashboard graph for one user; returns ``{node: value}``.
+
+    ``user`` (a profile row) and ``transactions_path`` default to the
+    registered files in ``USER_FILES``. ``seeded`` values are used as-is
+    instead of being computed, as with precomputed batch results.
+    """
+    from centinel.dashboard import graph  # deferred: pulls in the stores behind the graph
+
+    if user is None or transactions_path is None:
+        files = USER_FILES[user_id]
+        user = load_csv(files["user"]).iloc[0] if user is None else user
+        transactions_path = transactions_path or files["transactions"]
+    run = graph.run(user_id=user_id, transactions_path=transactions_path, user=user, **seeded)
+    return {node: run[node] for node in nodes}
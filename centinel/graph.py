@@ -0,0 +1,88 @@
+"""Declared, memoized computation nodes evaluated lazily per rerun.
+
+Nodes are registered with their dependencies on a ``Graph``. Each rerun opens
+a ``Run`` seeded with its inputs (selected user, file paths, ...); indexing
+the run computes a node and its dependencies on first use and returns the
+memoized value afterwards. A page therefore only pays for the nodes it reads,
+and no node runs twice in the same rerun.
+
+Nodes registered with ``shared=True`` are also looked up in a cross-session
+``ResultCache`` when the run is given one with a ``scope`` of
+``(user_id, data_version)``. A hit skips the node and all its dependencies.
+"""
+import time
+from functools import partial
+
+from centinel.instrument import span
+
+
+class Graph:
+    def __init__(self):
+        self.nodes = {}
+        self.shared = set()
+
+    def node(self, *deps, name=None, shared=False):
+        """Register the decorated function as a node fed by ``deps``."""
+        def register(fn):
+            self.nodes[name or fn.__name__] = (fn, deps)
+            if shared:
+                self.shared.add(name or fn.__name__)
+            return fn
+        return register
+
+    def run(self, cache=None, scope=None, **inputs):
+        return Run(self, inputs, cache, scope)
+
+
+class Run:
+    def __init__(self, graph, inputs, cache=None, scope=None):
+        self.graph = graph
+        self.values = dict(inputs)
+        self.events = []  # (node, "ran" | "hit" | "shared", seconds)
+        self.cache = cache
+        self.scope = scope
+        self._active = []
+
+    def __getitem__(self, name):
+        if name in self.values:
+            if name in self.graph.nodes:
+                self.events.append((name, "hit", 0.0))
+            return self.values[name]
+        if name not in self.graph.nodes:
+            raise KeyError(f"unknown node or missing input: {name}")
+        if name in self._active:
+            raise RuntimeError("dependency cycle: " + " -> ".join(self._active + [name]))
+        if self.cache is not None and name in self.graph.shared:
+            start = time.perf_counter()
+            value = self.cache.get_or_compute(*self.scope, name, partial(self._compute, name))
+            if name not in self.values:  # computed by an earlier or concurrent session
+                self.events.append((name, "shared", time.perf_counter() - start))
+            self.values[name] = value  # this run's own copy (``results._share``), not the cached object
+            return value
+        return self._compute(name)
+
+    def _compute(self, name):
+        fn, deps = self.graph.nodes[name]
+        self._active.append(name)
+        try:
+            args = [self[dep] for dep in deps]
+            with span(f"node:{name}") as sp:
+                start = time.perf_counter()
+                value = fn(*args)
+                elapsed = time.perf_counter() - start
+                sp.rows = len(value) if hasattr(value, "__len__") and not isinstance(value, str) else None
+        finally:
+            self._active.pop()
+        self.values[name] = value
+        self.events.append((name, "ran", elapsed))
+        return value
+
+    def report(self):
+        """One row per node touched this rerun: runs, cache hits and own time."""
+        rows = {}
+        for name, status, seconds in self.events:
+            row = rows.setdefault(name, {"node": name, "ran": 0, "hits": 0, "shared": 0, "ms": 0.0,
+                                         "deps": ", ".join(self.graph.nodes[name][1])})
+            row["hits" if status == "hit" else status] += 1
+            row["ms"] += seconds * 1000
+        return list(rows.values())
@@ -0,0 +1,70 @@
+"""Chunked reading of transaction CSVs, from the start or from a byte offset.
+
+    for frame, offset in read_chunks("fake_transactions.csv"):
+        ...                               # at most ~CHUNK_BYTES of rows each
+    for frame, offset in read_chunks(path, offset, columns):
+        ...                               # only what was appended since
+
+Each chunk is parsed on its own (``Date`` as datetime, ``Amount`` as float,
+every other column as string), so memory stays bounded by the chunk size
+whatever the file size. The offset yielded with a chunk is where the next
+read should start. Chunks always end on a line break, so a row is never
+split between two reads. The last line of the file is parsed even without a
+trailing newline. Callers that tail a growing file check that the byte at
+their saved offset is a newline before trusting the rows after it.
+Fields must not contain line breaks, which holds for the bank exports.
+"""
+import io
+import os
+
+import pandas as pd
+
+CHUNK_BYTES = int(float(os.environ.get("CENTINEL_CHUNK_MB", "8")) * 1024 * 1024)
+
+
+def csv_columns(path):
+    """The header row of ``path`` and the byte offset of the first data row."""
+    with open(path, "rb") as f:
+        header = f.readline()
+    columns = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist()
+    return columns, len(header)
+
+
+def parse_chunk(data, columns):
+    """Parse a block of complete CSV lines (no header) into a typed frame."""
+    dtype = {name: str for name in columns if name not in ("Date", "Amount")}
+    if "Amount" in columns:
+        dtype["Amount"] = float
+    frame = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=dtype)
+    if "Date" in frame:
+        frame["Date"] = pd.to_datetime(frame["Date"]).astype("datetime64[us]")
+    return frame
+
+
+def read_chunks(path, offset=None, columns=None, chunk_bytes=CHUNK_BYTES):
+    """Yield ``(frame, next_offset)`` for the rows of ``path`` from ``offset`` on.
+
+    ``offset`` defaults to the first data row. Pass the ``columns`` from an
+    earlier read when resuming, since the header is not reread then.
+    """
+    if columns is None or offset is None:
+        columns, first_row = csv_columns(path)
+        offset = first_row if offset is None else offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        carry = b""
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            data = carry + block
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                carry = data  # one line longer than a chunk; keep reading
+                continue
+            carry = data[cut:]
+            offset += cut
+            if data[:cut].strip():
+                yield parse_chunk(data[:cut], columns), offset
+        if carry.strip():
+            yield parse_chunk(carry, columns), offset + len(carry)
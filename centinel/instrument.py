@@ -0,0 +1,267 @@
+"""Named timing spans around the dashboard's hot paths.
+
+    with span("chart.pie", rows=len(totals)):
+        st.plotly_chart(px.pie(totals, ...))
+
+    @timed("advice.load")
+    def load_advice(): ...
+
+Spans only record while a rerun trace is active (``start`` ... ``finish``).
+Otherwise ``span`` hands back one shared no-op context manager, so
+instrumented code costs a context-variable lookup when tracing is off. A
+span records wall time, rows processed (``rows=`` or ``sp.rows = n``) and
+the change in process RSS (when psutil is installed).
+
+``finish`` folds the trace into per-page totals (``page_stats``), appends
+one JSON line per rerun to a rotating log, and rewrites ``metrics.prom`` in
+the Prometheus text format (at most every ``METRICS_INTERVAL`` seconds), so a
+node-exporter textfile collector or a local scraper can collect it.
+``start(page, profile=True)`` also captures a sampling profile of that one
+rerun with pyinstrument, or a cProfile dump without it.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from centinel.state import STATE_DIR, atomic_write
+
+try:
+    import psutil
+except ImportError:  # optional: spans then report no memory delta
+    psutil = None
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional: falls back to cProfile
+    Profiler = None
+
+ENABLED = os.environ.get("CENTINEL_TRACE") == "1"
+LOG_PATH = os.path.join(STATE_DIR, "trace.log")
+METRICS_PATH = os.path.join(STATE_DIR, "metrics.prom")
+PROFILE_DIR = os.path.join(STATE_DIR, "profiles")
+METRICS_INTERVAL = 5.0
+
+_current = contextvars.ContextVar("centinel_trace", default=None)
+_process = psutil.Process() if psutil is not None else None
+
+
+def _rss():
+    return _process.memory_info().rss if _process is not None else None
+
+
+class _NullSpan:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass  # instrumented code may set ``rows`` whether or not tracing is on
+
+
+_NULL = _NullSpan()
+
+
+class Span:
+    def __init__(self, trace, name, rows):
+        self.trace = trace
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.depth = self.trace._depth
+        self.trace._depth += 1
+        self._rss = _rss()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        rss = _rss()
+        self.trace._depth -= 1
+        self.trace.spans.append({
+            "span": self.name,
+            "ms": elapsed * 1000,
+            "rows": self.rows,
+            "mem_mb": None if rss is None else (rss - self._rss) / 2**20,
+            "depth": self.depth,
+        })
+        return False
+
+
+class Trace:
+    def __init__(self, page):
+        self.page = page
+        self.spans = []
+        self.total_ms = None
+        self.profile_path = None
+        self._depth = 0
+        self._profiler = None
+        self._start = time.perf_counter()
+
+
+def span(name, rows=None):
+    """Context manager timing ``name`` inside the active trace, if any."""
+    trace = _current.get()
+    if trace is None:
+        return _NULL
+    return Span(trace, name, rows)
+
+
+def timed(name=None):
+    """Decorator form of ``span``; the span is named after the function by default."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def active():
+    return _current.get() is not None
+
+
+# --- Rerun traces ---
+def start(page, profile=False):
+    """Begin tracing one rerun of ``page``; pair with ``finish``."""
+    trace = Trace(page)
+    if profile:
+        trace._profiler = _start_profiler()
+    _current.set(trace)
+    return trace
+
+
+def finish(trace):
+    """Close ``trace``, record it, and return it; later calls return it unchanged."""
+    if trace.total_ms is not None:
+        return trace
+    trace.total_ms = (time.perf_counter() - trace._start) * 1000
+    if _current.get() is trace:
+        _current.set(None)
+    if trace._profiler is not None:
+        trace.profile_path = _stop_profiler(trace._profiler, trace.page)
+    _record(trace)
+    return trace
+
+
+# --- Aggregates, log and metrics ---
+_stats = {}  # (page, span) -> {"calls", "ms", "max_ms", "rows"}
+_reruns = {}  # page -> {"reruns", "ms"}
+_lock = threading.Lock()
+_last_metrics = 0.0
+_logger = None
+
+
+def _log():
+    global _logger
+    if _logger is None:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        logger = logging.getLogger("centinel.trace")
+        logger.propagate = False
+        if not logger.handlers:
+            logger.addHandler(RotatingFileHandler(LOG_PATH, maxBytes=5 * 2**20, backupCount=3))
+        logger.setLevel(logging.INFO)
+        _logger = logger
+    return _logger
+
+
+def _record(trace):
+    global _last_metrics
+    with _lock:
+        totals = _reruns.setdefault(trace.page, {"reruns": 0, "ms": 0.0})
+        totals["reruns"] += 1
+        totals["ms"] += trace.total_ms
+        for s in trace.spans:
+            stat = _stats.setdefault((trace.page, s["span"]), {"calls": 0, "ms": 0.0, "max_ms": 0.0, "rows": 0})
+            stat["calls"] += 1
+            stat["ms"] += s["ms"]
+            stat["max_ms"] = max(stat["max_ms"], s["ms"])
+            stat["rows"] += s["rows"] or 0
+        write_metrics = time.monotonic() - _last_metrics >= METRICS_INTERVAL
+        if write_metrics:
+            _last_metrics = time.monotonic()
+            text = metrics_text()
+    _log().info(json.dumps({"ts": time.time(), "page": trace.page, "ms": round(trace.total_ms, 3), "spans": trace.spans}))
+    if write_metrics:
+        with atomic_write(METRICS_PATH) as f:
+            f.write(text)
+
+
+def page_stats():
+    """Per page and span: calls, total and mean ms, worst ms and rows, slowest first."""
+    with _lock:
+        rows = [
+            {"page": page, "span": name, "calls": s["calls"], "total_ms": s["ms"],
+             "mean_ms": s["ms"] / s["calls"], "max_ms": s["max_ms"], "rows": s["rows"]}
+            for (page, name), s in _stats.items()
+        ]
+    return sorted(rows, key=lambda r: (r["page"], -r["total_ms"]))
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def metrics_text():
+    """The aggregates in the Prometheus text exposition format."""
+    lines = [
+        "# HELP centinel_reruns_total Dashboard reruns per page.",
+        "# TYPE centinel_reruns_total counter",
+    ]
+    lines += [f'centinel_reruns_total{{page="{_label(p)}"}} {t["reruns"]}' for p, t in _reruns.items()]
+    lines += [
+        "# HELP centinel_rerun_seconds_total Wall time of dashboard reruns per page.",
+        "# TYPE centinel_rerun_seconds_total counter",
+    ]
+    lines += [f'centinel_rerun_seconds_total{{page="{_label(p)}"}} {t["ms"] / 1000:.6f}' for p, t in _reruns.items()]
+    for metric, field, scale, help_text in [
+        ("centinel_span_calls_total", "calls", 1, "Times each span ran."),
+        ("centinel_span_seconds_total", "ms", 1000, "Wall time spent in each span."),
+        ("centinel_span_rows_total", "rows", 1, "Rows processed by each span."),
+    ]:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for (page, name), s in _stats.items():
+            value = s[field] / scale
+            lines.append(f'{metric}{{page="{_label(page)}",span="{_label(name)}"}} {value:g}')
+    return "\n".join(lines) + "\n"
+
+
+# --- Profiling ---
+def _start_profiler():
+    if Profiler is not None:
+        profiler = Profiler(interval=0.001)
+        profiler.start()
+        return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler, page):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{page.lower()}")
+    if Profiler is not None and isinstance(profiler, Profiler):
+        profiler.stop()
+        path = f"{stem}.html"
+        with open(path, "w") as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        path = f"{stem}.prof"
+        profiler.dump_stats(path)
+    return path
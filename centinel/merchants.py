@@ -0,0 +1,104 @@
+"""Merchant classification, evaluated once per distinct merchant string.
+
+Rules live in ``merchant_rules.csv``. Each row maps a merchant class to
+either a regex searched in the merchant name (``contains``) or an exact name
+(``equals``). Classes are memoized per merchant, so tagging a frame costs
+one dictionary lookup per distinct merchant plus a vectorized gather over
+the rows.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from centinel.data import file_fingerprint, load_csv
+
+RULES_PATH = "merchant_rules.csv"
+OTHER = "other"
+MAX_MEMO = 100_000
+
+
+class MerchantClassifier:
+    def __init__(self, rules, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.rules = rules.dropna(subset=["merchant_class", "pattern"]).reset_index(drop=True)
+        self.classes = list(dict.fromkeys(self.rules["merchant_class"]))
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _classify_new(self, merchants):
+        names = pd.Series(merchants, dtype=object)
+        hits = pd.DataFrame(False, index=names.index, columns=self.classes)
+        for rule in self.rules.itertuples():
+            if rule.match == "equals":
+                matched = names == rule.pattern
+            else:
+                case = str(rule.case_sensitive).lower() == "true"
+                matched = names.str.contains(rule.pattern, case=case, na=False)
+            hits[rule.merchant_class] |= matched.to_numpy(dtype=bool)
+        return dict(zip(merchants, map(tuple, hits.to_numpy())))
+
+    def classify(self, merchants):
+        """Return a ``len(merchants) x len(classes)`` boolean array."""
+        unknown = [m for m in merchants if m not in self._memo]
+        if unknown:
+            found = self._classify_new(unknown)
+            with self._lock:
+                if len(self._memo) + len(found) > MAX_MEMO:
+                    self._memo.clear()
+                self._memo.update(found)
+        empty = (False,) * len(self.classes)
+        return np.array([self._memo.get(m, empty) for m in merchants], dtype=bool).reshape(-1, len(self.classes))
+
+    def flags(self, merchant_column):
+        """Per-row flags for a ``Merchant`` column, one array per class.
+
+        Missing merchants match no class.
+        """
+        codes, merchants = pd.factorize(merchant_column)
+        per_merchant = self.classify(list(merchants))
+        # Code -1 (missing merchant) picks the trailing all-False row.
+        per_merchant = np.vstack([per_merchant, np.zeros((1, len(self.classes)), dtype=bool)])
+        rows = per_merchant[codes]
+        return {cls: rows[:, i] for i, cls in enumerate(self.classes)}
+
+
+_classifiers = {}
+_lock = threading.Lock()
+
+
+def default_classifier(path=RULES_PATH):
+    """Classifier for ``merchant_rules.csv``, rebuilt only when the file changes."""
+    fingerprint = file_fingerprint(path)
+    with _lock:
+        classifier = _classifiers.get(fingerprint[0])
+        if classifier is not None and classifier.fingerprint == fingerprint:
+            return classifier
+    classifier = MerchantClassifier(load_csv(path), fingerprint)
+    with _lock:
+        _classifiers[fingerprint[0]] = classifier
+    return classifier
+
+
+def merchant_flags(df, classifier=None):
+    """Per-row class flags for ``df``, reusing ``is_<class>`` columns if present."""
+    classifier = classifier or default_classifier()
+    if all(f"is_{cls}" in df for cls in classifier.classes):
+        return {cls: df[f"is_{cls}"].to_numpy(dtype=bool) for cls in classifier.classes}
+    return classifier.flags(df["Merchant"])
+
+
+def add_merchant_flags(df, classifier=None):
+    """Return ``df`` with ``is_<class>`` flag columns and a ``merchant_class`` column.
+
+    ``merchant_class`` is the first matching class in rule order, or
+    ``"other"``.
+    """
+    classifier = classifier or default_classifier()
+    flags = classifier.flags(df["Merchant"])
+    primary = np.full(len(df), OTHER, dtype=object)
+    for cls in reversed(classifier.classes):
+        primary[flags[cls]] = cls
+    columns = {f"is_{cls}": values for cls, values in flags.items()}
+    columns["merchant_class"] = pd.Categorical(primary, categories=classifier.classes + [OTHER])
+    return df.assign(**columns)
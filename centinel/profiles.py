@@ -0,0 +1,286 @@
+"""Write-ahead log for profile edits and XP, token and streak changes.
+
+Saving a change appends one JSON line to ``.centinel_state/profiles.wal``,
+fsyncs it and returns; nothing is rewritten on the request path. Each line either
+assigns profile fields (``set``) or adds to counters (``add``), so two
+sessions awarding XP at once both count. Reads go through ``get``, which
+overlays this process's pending changes on the user directory row.
+
+A background thread compacts the log every ``COMPACT_INTERVAL`` seconds, or
+sooner once ``COMPACT_ENTRIES`` changes are pending:
+
+1. the log is renamed to ``profiles.<ns>.compacting`` under an exclusive
+   lock, so new appends start a fresh log;
+2. the batch is applied to the user directory in one transaction that also
+   records the batch name, so a replay after a crash applies it only once;
+3. the touched users' CSVs (``USER_FILES`` / ``PROFILE_FILES``) and progress
+   files are rewritten from the directory via temp file and atomic rename;
+4. the compacting file is deleted.
+
+Leftover compacting files from a crashed run are finished on startup. A
+failed compaction is logged, counted in ``stats["errors"]`` and retried with
+a doubling delay (up to ``MAX_BACKOFF`` seconds); until one succeeds the
+batches stay on disk and ``error`` holds the last failure.
+Appends take a shared ``fcntl`` lock where available, so several app
+processes can share one log.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from centinel.registry import USER_FILES
+from centinel.state import STATE_DIR, write_json
+from centinel.users import INTEGER_COLUMNS, check_fields, user_directory
+
+try:
+    import fcntl
+except ImportError:  # optional: only needed when several processes share the log
+    fcntl = None
+
+WAL_PATH = os.path.join(STATE_DIR, "profiles.wal")
+COMPACT_INTERVAL = float(os.environ.get("CENTINEL_WAL_COMPACT_S", "2"))
+COMPACT_ENTRIES = 1000
+MAX_BACKOFF = 60.0
+
+logger = logging.getLogger(__name__)
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+def merge(pending, fields, deltas):
+    """Fold one change into a user's pending ``(fields, deltas)``."""
+    merged_fields, merged_deltas = pending
+    for column, value in fields.items():
+        merged_fields[column] = value
+        merged_deltas.pop(column, None)
+    for column, delta in deltas.items():
+        if column in merged_fields:
+            merged_fields[column] = (merged_fields[column] or 0) + delta
+        else:
+            merged_deltas[column] = merged_deltas.get(column, 0) + delta
+    return merged_fields, merged_deltas
+
+
+def _read_batch(path):
+    updates = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn line from a crash mid-append
+            pending = updates.setdefault(entry["user_id"], ({}, {}))
+            merge(pending, entry.get("set", {}), entry.get("add", {}))
+    return updates
+
+
+def _write_progress(path, profile):
+    try:
+        with open(path) as f:
+            progress = json.load(f)
+    except FileNotFoundError:
+        progress = {}
+    progress.update({
+        "username": profile["name"],
+        "xp": int(profile["xp_points"] or 0),
+        "streak_days": int(profile["streak_days"] or 0),
+    })
+    write_json(path, progress, indent=2)
+
+
+class ProfileLog:
+    def __init__(self, path=WAL_PATH, directory=None, user_files=USER_FILES):
+        self.path = path
+        self.directory = directory or user_directory()
+        self.user_files = user_files
+        # user_id -> (fields, deltas) appended by this process to the log file
+        # with inode ``_inode``, and to the batch this process is compacting.
+        self._pending = {}
+        self._inode = None
+        self._flushing = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._compact_fd = os.open(f"{path}.compact.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self.stats = {"appended": 0, "compactions": 0, "compacted": 0, "errors": 0}
+        self.error = None  # last compaction failure, cleared by the next success
+
+    def _flock(self, exclusive, fd=None):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd if fd is None else fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def _unlock(self, fd=None):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd if fd is None else fd, fcntl.LOCK_UN)
+
+    def _batch_pattern(self):
+        return f"{os.path.splitext(self.path)[0]}.*.compacting"
+
+    def _current_inode(self):
+        try:
+            return os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+
+    # --- Writes ---
+    def record(self, user_id, fields=None, deltas=None):
+        """Append one change for ``user_id``; applied by the next compaction."""
+        fields, deltas = dict(fields or {}), dict(deltas or {})
+        check_fields(fields)
+        check_fields(deltas)
+        if set(deltas) - INTEGER_COLUMNS:
+            raise ValueError(f"only {sorted(INTEGER_COLUMNS)} can be incremented")
+        line = json.dumps({"ts": time.time(), "user_id": user_id, "set": fields, "add": deltas}) + "\n"
+        with self._lock:
+            self._flock(exclusive=False)
+            try:
+                # One O_APPEND write per change: lines from concurrent writers never interleave.
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line.encode())
+                    _sync(fd)
+                    inode = os.fstat(fd).st_ino
+                finally:
+                    os.close(fd)
+            finally:
+                self._unlock()
+            if inode != self._inode:
+                # Another process rotated the log and owns what we appended before.
+                self._pending, self._inode = {}, inode
+            merge(self._pending.setdefault(user_id, ({}, {})), fields, deltas)
+            self._count += 1
+            self.stats["appended"] += 1
+        self._start_worker()
+        if self._count >= COMPACT_ENTRIES:
+            self._wake.set()
+
+    def update(self, user_id, **fields):
+        self.record(user_id, fields=fields)
+
+    def increment(self, user_id, **deltas):
+        self.record(user_id, deltas=deltas)
+
+    # --- Reads ---
+    def get(self, user_id):
+        """The user's profile with this process's not-yet-compacted changes applied."""
+        profile = self.directory.get(user_id)
+        if profile is None:
+            return None
+        inode = self._current_inode()
+        with self._lock:
+            pending = ({}, {})
+            for source in (self._flushing, self._pending if inode == self._inode else {}):
+                if user_id in source:
+                    merge(pending, *source[user_id])
+        fields, deltas = pending
+        if not fields and not deltas:
+            return profile
+        profile = profile.copy()
+        for column, value in fields.items():
+            profile[column] = value
+        for column, delta in deltas.items():
+            profile[column] = (profile[column] or 0) + delta
+        return profile
+
+    # --- Compaction ---
+    def _start_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="centinel-wal-compactor", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        delay = COMPACT_INTERVAL
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            delay = self._compact_or_back_off(delay)
+
+    def _compact_or_back_off(self, delay):
+        """One background compaction; returns the delay before the next one."""
+        try:
+            self.compact()
+        except Exception as exc:
+            # The batches keep every change until a compaction succeeds.
+            delay = min(delay * 2, MAX_BACKOFF)
+            self.stats["errors"] += 1
+            self.error = f"{type(exc).__name__}: {exc}"
+            logger.exception("profile log compaction failed; retrying in %.0f s", delay)
+            return delay
+        self.error = None
+        return COMPACT_INTERVAL
+
+    def compact(self):
+        """Apply every logged change and truncate the log; returns changes applied."""
+        with self._compact_lock:
+            # One compactor per log across processes; appends only wait for the rename.
+            self._flock(exclusive=True, fd=self._compact_fd)
+            try:
+                return self._compact()
+            finally:
+                self._unlock(fd=self._compact_fd)
+
+    def _compact(self):
+        with self._lock:
+            self._flock(exclusive=True)
+            try:
+                rotated = self._current_inode()
+                if rotated is not None:
+                    os.replace(self.path, self._batch_pattern().replace("*", str(time.time_ns())))
+            finally:
+                self._unlock()
+            # Our pending changes are in the batch only if it is the file we appended to.
+            self._flushing = self._pending if rotated is not None and rotated == self._inode else {}
+            self._pending, self._inode, self._count = {}, None, 0
+        applied = 0
+        try:
+            for batch in sorted(glob.glob(self._batch_pattern())):
+                applied += self._apply(batch)
+        finally:
+            with self._lock:
+                self._flushing = {}
+        self.stats["compactions"] += 1
+        self.stats["compacted"] += applied
+        return applied
+
+    def _apply(self, batch):
+        updates = _read_batch(batch)
+        self.directory.apply_batch(os.path.basename(batch), updates)
+        with self._lock:
+            # The directory now has these changes; stop overlaying them.
+            for user_id in updates:
+                self._flushing.pop(user_id, None)
+        # Rewriting from the directory is idempotent, so a replay repeats it safely.
+        self.directory.write_back(updates)
+        for user_id in updates:
+            progress = self.user_files.get(user_id, {}).get("progress")
+            if progress:
+                _write_progress(progress, self.directory.get(user_id))
+        os.remove(batch)
+        return sum(len(fields) + len(deltas) for fields, deltas in updates.values())
+
+    def close(self):
+        self.compact()
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def profile_log(path=WAL_PATH):
+    """Process-wide log for ``path``; compacted once more at interpreter exit."""
+    with _logs_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = _logs[path] = ProfileLog(path)
+            log.compact()  # finish anything a previous process left behind
+            atexit.register(log.close)
+    return log
@@ -0,0 +1,235 @@
+"""Prefix-sum index over a rollup for arbitrary date-range queries.
+
+    index = refresh_index("U001", rollup, version)
+    index.totals("category", start, end)     # per-category sums, O(log n + k)
+    range_summary(index, start, end)          # spend, savings, severities ...
+
+``DayIndex`` keeps, for every indexed day, the running totals of the rollup
+values (``rollups.VALUES``) by category and by merchant class. A range total
+is the difference of two running totals found by binary search on the day
+array, so no query rescans the rollup or the transactions. When the rollup
+grows, only the days from the last indexed day on are re-accumulated. The
+index keeps an order-independent checksum of the rollup rows before its last
+day; if those rows differ in any way, say rows dated before the last day or
+a rewritten export, or if merchants were reclassified, the index is rebuilt
+from the rollup. Rehashing those rows costs a pass over the rollup, so it is
+skipped when the transaction store shows the refresh only appended files
+dated from the last indexed day on. Ranges follow the window convention ``start <= day < end``,
+and either bound may be ``None``; rows without a date are not indexed, as in
+``triggers.trigger_matrix``.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from centinel.rollups import VALUES, bucket, resolution
+from centinel.triggers import FREQUENT_WITHDRAWALS, HIGH_DINING_SPEND, LOW_SAVINGS
+
+DIMENSIONS = ["category", "merchant_class"]
+
+
+def _days(rollup):
+    return rollup["day"].to_numpy().astype("datetime64[D]")
+
+
+def _dated(rollup):
+    """``rollup``'s rows that have a day, and those days."""
+    day = _days(rollup)
+    dated = ~np.isnat(day)
+    if dated.all():
+        return rollup, day
+    return rollup[dated], day[dated]
+
+
+def _digest(rollup, day):
+    """Checksum of ``rollup``'s rows (days ``day``) that ignores their order."""
+    rows = rollup[DIMENSIONS + VALUES].astype({dim: object for dim in DIMENSIONS} | {v: float for v in VALUES})
+    rows.insert(0, "day", day.astype(np.int64))
+    # Sum of per-row hashes, wrapping at 2**64: any changed, added or dropped row shows.
+    return int(pd.util.hash_pandas_object(rows, index=False).to_numpy().sum(dtype=np.uint64))
+
+
+def _bound(value):
+    return None if value is None else np.datetime64(pd.Timestamp(value).date(), "D")
+
+
+class DayIndex:
+    def __init__(self, days, labels, cums, digest=0):
+        self.days = days  # sorted datetime64[D], one per day with rows
+        self.labels = labels  # dimension -> list of labels
+        self.cums = cums  # dimension -> (len(days) + 1, len(labels), len(VALUES)) running totals
+        self.digest = digest  # _digest of the rollup rows before the last day
+
+    @classmethod
+    def build(cls, rollup):
+        rollup, day = _dated(rollup)
+        days, positions = np.unique(day, return_inverse=True)
+        labels, cums = {}, {}
+        for dim in DIMENSIONS:
+            labels[dim] = []
+            cums[dim] = np.zeros((len(days) + 1, 0, len(VALUES)))
+        index = cls(days, labels, cums)
+        index._accumulate(0, days, positions, rollup)
+        if len(days):
+            earlier = day < days[-1]
+            index.digest = _digest(rollup[earlier], day[earlier])
+        return index
+
+    def _accumulate(self, start, days, positions, rollup):
+        """Replace everything from day position ``start`` on with ``rollup``'s rows."""
+        values = rollup[VALUES].to_numpy(dtype=float)
+        for dim in DIMENSIONS:
+            labels = self.labels[dim]
+            codes, found = pd.factorize(rollup[dim], use_na_sentinel=False)
+            found = [None if pd.isna(label) else label for label in found]
+            labels += [label for label in found if label not in labels]
+            codes = np.array([labels.index(label) for label in found], dtype=np.int64)[codes]
+            per_day = np.zeros((len(days), len(labels), len(VALUES)))
+            np.add.at(per_day, (positions, codes), values)
+            head = self.cums[dim][: start + 1]
+            head = np.pad(head, ((0, 0), (0, len(labels) - head.shape[1]), (0, 0)))
+            self.cums[dim] = np.concatenate([head, head[-1] + np.cumsum(per_day, axis=0)])
+        self.days = np.concatenate([self.days[:start], days])
+
+    def extend(self, rollup, since=None):
+        """Bring the index up to date with a grown ``rollup``; returns the index to use.
+
+        ``since`` is the earliest date of any transaction added since the index
+        was built, if known. Unless it is on or after the last indexed day, the
+        rows before that day are checked against the index's checksum.
+        """
+        if not len(self.days):
+            return DayIndex.build(rollup)
+        start = len(self.days) - 1
+        dated, day = _dated(rollup)
+        recent = day >= self.days[start]
+        if since is None or _bound(since) < self.days[start]:
+            if _digest(dated[~recent], day[~recent]) != self.digest:
+                return DayIndex.build(rollup)  # rows changed before the last indexed day
+        # A new index, so sessions still reading this one never see a half update.
+        index = DayIndex(self.days, {dim: list(labels) for dim, labels in self.labels.items()}, dict(self.cums))
+        days, positions = np.unique(day[recent], return_inverse=True)
+        index._accumulate(start, days, positions, dated[recent])
+        # Rows from the old last day up to the new one now come before the last day.
+        settled = recent & (day < index.days[-1])
+        index.digest = (self.digest + _digest(dated[settled], day[settled])) % 2**64
+        return index
+
+    # --- Queries ---
+    def _span(self, start, end):
+        lo = 0 if start is None else int(np.searchsorted(self.days, _bound(start), side="left"))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, _bound(end), side="left"))
+        return lo, max(lo, hi)
+
+    def totals(self, dim, start=None, end=None):
+        """Sums of ``VALUES`` per ``dim`` label over the range, as a frame."""
+        lo, hi = self._span(start, end)
+        sums = self.cums[dim][hi] - self.cums[dim][lo]
+        return pd.DataFrame(sums, index=pd.Index(self.labels[dim], name=dim), columns=VALUES)
+
+    def value(self, dim, label, value, start=None, end=None):
+        """One label's total of one value over the range."""
+        if label not in self.labels[dim]:
+            return 0.0
+        lo, hi = self._span(start, end)
+        i, j = self.labels[dim].index(label), VALUES.index(value)
+        return float(self.cums[dim][hi, i, j] - self.cums[dim][lo, i, j])
+
+    def daily(self, dim, start=None, end=None):
+        """Per-day totals over the range: ``(days, (days, labels, VALUES) array)``."""
+        lo, hi = self._span(start, end)
+        return self.days[lo:hi], np.diff(self.cums[dim][lo:hi + 1], axis=0)
+
+    @property
+    def first_day(self):
+        return pd.Timestamp(self.days[0]) if len(self.days) else None
+
+
+# --- Per-user indexes, kept for the process ---
+_indexes = {}  # user_id -> (key, index, files)
+_lock = threading.Lock()
+
+
+def _appended_since(old, new):
+    """Earliest date in the files ``new`` adds to ``old``, or None if files went away."""
+    if old is None or new is None or not set(old) <= set(new):
+        return None
+    dates = [date for name, date in new.items() if name not in old and date is not None]
+    return min(dates) if dates else pd.Timestamp.max
+
+
+def refresh_index(user_id, rollup, key, files=None):
+    """The user's index for ``rollup``, extended rather than rebuilt when it grew.
+
+    ``key`` identifies the rollup's source (export and merchant rules); the
+    index is reused as-is while it matches and extended when only the export
+    changed. ``files`` is the transaction store's ``file_dates``, which lets
+    the extension skip checking days an append could not have touched.
+    """
+    with _lock:
+        entry = _indexes.get(user_id)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    if entry is not None and entry[0][1] == key[1]:
+        index = entry[1].extend(rollup, _appended_since(entry[2], files))
+    else:
+        index = DayIndex.build(rollup)  # first use, or merchants were reclassified
+    with _lock:
+        _indexes[user_id] = (key, index, files)
+    return index
+
+
+# --- Range analytics ---
+def range_summary(index, start=None, end=None):
+    """Chart totals, trigger severities and sum-based triggers for one range.
+
+    Every figure is a constant number of index lookups. Only the triggers
+    that are sums or counts are evaluated; income stability and subscription
+    overlap need distinct months and merchants, which the index does not keep.
+    Merchant triggers count the ``is_<class>`` flags, as ``trigger_matrix``
+    does, not the primary merchant class.
+    """
+    categories = index.totals("category", start, end)
+
+    def category(label, value="amount"):
+        return float(categories.at[label, value]) if label in categories.index else 0.0
+
+    def flagged(cls):
+        return float(categories[f"{cls}_rows"].sum())
+
+    spending = categories[categories["spend_rows"] > 0]["spend"].abs()
+    # Same measures as triggers.trigger_severity.
+    severity = {
+        "high_spending": abs(categories["spend"].sum()),
+        "low_savings": abs(category("Savings")),
+        "frequent_withdrawals": flagged("withdrawal"),
+        "subscription_overlap": category("Subscriptions"),
+        "new_investment_activity": category("Investments"),
+    }
+    active = {
+        "high_spending": category("Dining Out") < HIGH_DINING_SPEND,
+        "low_savings": category("Savings") < LOW_SAVINGS,
+        "crypto_interest": flagged("crypto") > 0,
+        "frequent_withdrawals": flagged("withdrawal") >= FREQUENT_WITHDRAWALS,
+        "new_investment_activity": flagged("investment") > 0,
+    }
+    return {
+        "net": float(categories["amount"].sum()),
+        "spent": abs(float(categories["spend"].sum())),
+        "saved": category("Savings"),
+        "invested": category("Investments"),
+        "transactions": int(categories["rows"].sum()),
+        "category_spend": spending[spending > 0].sort_values(ascending=False).rename_axis("Category").reset_index(name="Amount"),
+        "severity": severity,
+        "triggers": [t for t, on in active.items() if on],
+    }
+
+
+def range_spend_series(index, start=None, end=None, freq=None):
+    """Spending per day (or week/month for long ranges) over the range."""
+    days, per_day = index.daily("category", start, end)
+    spend = pd.Series(np.abs(per_day[:, :, VALUES.index("spend")].sum(axis=1)), index=pd.to_datetime(days))
+    spend = spend[per_day[:, :, VALUES.index("spend_rows")].sum(axis=1) > 0]
+    buckets = bucket(spend.index.to_series(), freq or resolution(spend.index.to_series()))
+    return spend.groupby(buckets.to_numpy()).sum().rename_axis("Date").reset_index(name="Amount")
@@ -0,0 +1,117 @@
+"""Tag-index scoring for module and challenge recommendations.
+
+A catalog is compiled once (per file version) into a multi-hot matrix over
+its goal, trigger and achievement tags, with each field's weight folded into
+its columns. Scoring a user is then one matrix-vector product against the
+user's goals, active triggers and unlocked achievements, followed by a
+top-k selection.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from centinel.data import file_fingerprint, load_csv
+
+# column -> (tag kind, weight, separator); a separator of None means single-valued.
+MODULE_FIELDS = {
+    "goal_tags": ("goal", 1, ";"),
+    "behavior_triggers": ("trigger", 1, ";"),
+}
+CHALLENGE_FIELDS = {
+    "linked_goal": ("goal", 2, None),
+    "linked_trigger": ("trigger", 1, None),
+    # Unlocked achievements cancel the +1 bonus below.
+    "linked_achievement": ("achievement", -1, None),
+}
+
+
+class TagIndex:
+    """Weighted multi-hot matrix over a catalog's tag columns."""
+
+    def __init__(self, catalog, fields, bias=None):
+        self.catalog = catalog
+        self.vocabulary = {}
+        rows, cols, weights = [], [], []
+        for column, (kind, weight, sep) in fields.items():
+            tags = catalog[column].reset_index(drop=True)
+            if sep is not None:
+                tags = tags.str.split(sep).explode()
+            # A tag repeated inside one row still counts once, like a set.
+            pairs = tags.dropna().astype(str).reset_index().drop_duplicates()
+            distinct = pairs[column].unique()
+            for tag in distinct:
+                self.vocabulary.setdefault((kind, tag), len(self.vocabulary))
+            distinct_cols = np.array([self.vocabulary[(kind, tag)] for tag in distinct], dtype=np.int64)
+            rows.append(pairs["index"].to_numpy())
+            cols.append(distinct_cols[pd.Index(distinct).get_indexer(pairs[column])])
+            weights.append(np.full(len(pairs), weight, dtype=np.float32))
+        self.matrix = np.zeros((len(catalog), len(self.vocabulary)), dtype=np.float32)
+        if rows:
+            np.add.at(self.matrix, (np.concatenate(rows), np.concatenate(cols)), np.concatenate(weights))
+        self.bias = np.zeros(len(catalog), dtype=np.float32) if bias is None else np.asarray(bias, dtype=np.float32)
+
+    def user_vector(self, **tags):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for kind, values in tags.items():
+            for tag in set(values):
+                col = self.vocabulary.get((kind, tag))
+                if col is not None:
+                    vector[col] = 1
+        return vector
+
+    def score(self, goals=(), triggers=(), achievements=()):
+        """Score every catalog row; returns an int array aligned with ``catalog``."""
+        vector = self.user_vector(goal=goals, trigger=triggers, achievement=achievements)
+        return np.rint(self.bias + self.matrix @ vector).astype(np.int64)
+
+    def rank(self, k, min_score=None, **tags):
+        """Top ``k`` catalog rows by score, with the score as a column."""
+        scores = self.score(**tags)
+        positions = top_k(scores, k, min_score)
+        return self.catalog.iloc[positions].assign(score=scores[positions])
+
+
+def top_k(scores, k, min_score=None):
+    """Positions of the ``k`` highest scores, ties kept in catalog order."""
+    scores = np.asarray(scores)
+    positions = np.arange(len(scores)) if min_score is None else np.flatnonzero(scores >= min_score)
+    if k < len(positions):
+        kth = np.partition(scores[positions], len(positions) - k)[len(positions) - k]
+        positions = positions[scores[positions] >= kth]
+    order = np.argsort(-scores[positions], kind="stable")
+    return positions[order][:k]
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _cached_index(path, build):
+    key = (build.__name__, file_fingerprint(path))
+    with _lock:
+        index = _indexes.get(key)
+    if index is None:
+        index = build(load_csv(path))
+        with _lock:
+            # Drop indexes compiled from older versions of the same file.
+            for stale in [k for k in _indexes if k[0] == key[0] and k[1][0] == key[1][0]]:
+                del _indexes[stale]
+            _indexes[key] = index
+    return index
+
+
+def _build_module_index(modules_df):
+    return TagIndex(modules_df, MODULE_FIELDS)
+
+
+def _build_challenge_index(challenges_df):
+    return TagIndex(challenges_df, CHALLENGE_FIELDS, bias=challenges_df["linked_achievement"].notna())
+
+
+def module_index(path="modules.csv"):
+    return _cached_index(path, _build_module_index)
+
+
+def challenge_index(path="challenges.csv"):
+    return _cached_index(path, _build_challenge_index)
@@ -0,0 +1,28 @@
+"""Where each user's profile and transaction files live."""
+import os
+
+USER_FILES = {
+    "U001": {"user": "user_data.csv", "transactions": "fake_transactions.csv", "progress": "xp_progress.json"},
+    "U002": {"user": "user2_data.csv", "transactions": "fake_transactions2.csv"}
+}
+# Every profile the user directory imports, including users without transactions.
+PROFILE_FILES = [files["user"] for files in USER_FILES.values()] + ["user3_data.csv"]
+
+
+def discover(directory):
+    """Registry for a directory holding one ``<user_id>/`` folder per user.
+
+    Each folder needs a ``user.csv`` and a ``transactions.csv``; folders
+    missing either are skipped.
+    """
+    registry = {}
+    for user_id in sorted(os.listdir(directory)):
+        user_path = os.path.join(directory, user_id, "user.csv")
+        transactions_path = os.path.join(directory, user_id, "transactions.csv")
+        if os.path.isfile(user_path) and os.path.isfile(transactions_path):
+            registry[user_id] = {"user": user_path, "transactions": transactions_path}
+    return registry
+
+
+def load_registry(directory=None):
+    return USER_FILES if directory is None else discover(directory)
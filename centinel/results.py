@@ -0,0 +1,167 @@
+"""Derived per-user results shared by every session in the process.
+
+    cache = result_cache()
+    value = cache.get_or_compute("U001", version, "top_triggers", compute)
+
+Entries are keyed by user id, a data version and a name. The version is
+``inputs_fingerprint`` of the user's profile fields, transaction export and
+catalogs, so an entry is only reused while nothing it was computed from
+changed. Storing a new version of a result drops the older one. Entries are
+evicted least-recently-used first once their estimated size passes
+``RESULT_CACHE_BUDGET_BYTES``. When several sessions miss on the same key at
+once, one computes it and the others wait for its value. Hits, misses,
+coalesced waits and evictions are counted in ``stats()``.
+"""
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from centinel.data import file_fingerprint, handout
+
+RESULT_CACHE_BUDGET_BYTES = int(float(os.environ.get("CENTINEL_RESULT_CACHE_MB", "64")) * 1024 * 1024)
+CATALOGS = ["modules.csv", "challenges.csv", "merchant_rules.csv"]
+# The only profile fields the dashboard graph's shared nodes read.
+PROFILE_INPUTS = ["goal_tags", "achievements", "current_path"]
+
+
+def inputs_fingerprint(user, files):
+    """What a user's derived analytics depend on, as a JSON-friendly dict."""
+    # The profile is compared by value: the app reads it from the user
+    # directory, where edits land without touching the CSV.
+    return {
+        "user": [None if pd.isna(user[field]) else str(user[field]) for field in PROFILE_INPUTS],
+        "transactions": list(file_fingerprint(files["transactions"])),
+        "catalogs": [list(file_fingerprint(path)) for path in CATALOGS],
+    }
+
+
+def data_version(user, files):
+    """``inputs_fingerprint`` as a hashable cache version."""
+    return json.dumps(inputs_fingerprint(user, files), separators=(",", ":"))
+
+
+def _sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+def _share(value):
+    # Callers get their own copy, down to frames nested in containers:
+    # mutating it never reaches the cached value or other sessions.
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return handout(value)
+    if isinstance(value, dict):
+        return {key: _share(item) for key, item in value.items()}
+    if type(value) in (list, tuple, set):  # not namedtuples: their fields are positional
+        return type(value)(_share(item) for item in value)
+    return value
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    def __init__(self, budget_bytes=RESULT_CACHE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()  # (user_id, version, name) -> (value, nbytes)
+        self._current = {}  # (user_id, name) -> version stored last
+        self._flights = {}  # key -> _Flight while being computed
+        self._bytes = 0
+        self._counts = {"hits": 0, "misses": 0, "waits": 0, "evictions": 0, "replaced": 0}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, user_id, version, name, compute):
+        """The cached value for the key, calling ``compute()`` once if missing."""
+        key = (user_id, version, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+                return _share(entry[0])
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counts["misses"] += 1
+            else:
+                self._counts["waits"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _share(flight.value)
+
+        try:
+            flight.value = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        else:
+            self._store(key, flight.value)
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return _share(flight.value)
+
+    def _store(self, key, value):
+        nbytes = _sizeof(value)
+        user_id, version, name = key
+        with self._lock:
+            previous = self._current.get((user_id, name))
+            if previous is not None and previous != version:
+                stale = self._entries.pop((user_id, previous, name), None)
+                if stale is not None:
+                    self._bytes -= stale[1]
+                    self._counts["replaced"] += 1
+            self._current[(user_id, name)] = version
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.budget_bytes and len(self._entries) > 1:
+                evicted, (_, size) = self._entries.popitem(last=False)
+                self._bytes -= size
+                self._counts["evictions"] += 1
+                if self._current.get((evicted[0], evicted[2])) == evicted[1]:
+                    del self._current[(evicted[0], evicted[2])]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, entries=len(self._entries), bytes=self._bytes, budget=self.budget_bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current.clear()
+            self._bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def result_cache():
+    """The process-wide cache, shared by every Streamlit session."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
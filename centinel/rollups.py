@@ -0,0 +1,173 @@
+"""Materialized day x category x merchant-class rollups of a user's transactions.
+
+Every chart on the dashboard is a sum or count over some date range, sliced
+by category or merchant class. The rollup keeps exactly those sums, one row
+per (day, category, merchant_class):
+
+    amount        net sum of Amount
+    spend         sum of the negative amounts
+    rows          transactions with an amount
+    spend_rows    transactions with a negative amount
+    <class>_rows  transactions flagged ``is_<class>``, for each ``FLAG_CLASSES``
+
+It is built once per user, persisted next to the trigger state, and extended
+with only the appended rows when the feed grows (the same tail-hash check as
+``trigger_state`` forces a rebuild when the export was rewritten). Queries
+over long ranges are bucketed to weekly or monthly resolution so a chart
+never carries more than about ``MAX_POINTS`` points. ``merchant_class`` is a
+transaction's first matching merchant rule, so a class is only counted
+separately from the classes listed above it in ``merchant_rules.csv``. The
+``<class>_rows`` counts use every matching rule instead, like the triggers,
+so anything that mirrors a trigger reads those.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from centinel.merchants import add_merchant_flags, default_classifier, merchant_flags
+from centinel.state import STATE_DIR, atomic_write
+from centinel.trigger_state import extends, fold_frames, frame_loader
+
+ROLLUP_VERSION = 2
+KEYS = ["day", "category", "merchant_class"]
+# The merchant classes ``triggers.row_features`` reads flags for.
+FLAG_CLASSES = ["withdrawal", "crypto", "investment"]
+VALUES = ["amount", "spend", "rows", "spend_rows"] + [f"{cls}_rows" for cls in FLAG_CLASSES]
+MAX_POINTS = 120
+
+
+def _aggregate(df):
+    if "merchant_class" not in df:
+        df = add_merchant_flags(df)
+    flags = merchant_flags(df)
+    no_match = np.zeros(len(df), dtype=bool)
+    amount = df["Amount"].to_numpy(dtype=float)
+    spending = amount < 0
+    rows = pd.DataFrame({
+        "day": df["Date"].dt.normalize().to_numpy(),
+        "category": df["Category"].to_numpy(dtype=object),
+        "merchant_class": df["merchant_class"].to_numpy(dtype=object),
+        "amount": amount,
+        "spend": np.where(spending, amount, 0.0),
+        "rows": (~np.isnan(amount)).astype(np.int64),
+        "spend_rows": spending.astype(np.int64),
+        **{f"{cls}_rows": flags.get(cls, no_match).astype(np.int64) for cls in FLAG_CLASSES},
+    })
+    return rows.groupby(KEYS, dropna=False, sort=False)[VALUES].sum().reset_index()
+
+
+def _merge(rollup, part):
+    merged = pd.concat([rollup, part], ignore_index=True)
+    return merged.groupby(KEYS, dropna=False, sort=False)[VALUES].sum().reset_index()
+
+
+def _empty():
+    rollup = _aggregate(pd.DataFrame({
+        "Date": pd.Series(dtype="datetime64[us]"), "Category": pd.Series(dtype=object),
+        "Merchant": pd.Series(dtype=object), "Amount": pd.Series(dtype=float),
+    }))
+    return rollup, {"version": ROLLUP_VERSION, "rows": 0, "tail_hash": None}
+
+
+def build_rollup(df):
+    """Return ``(rollup, meta)`` for the full transaction history ``df``."""
+    rollup, meta = _empty()
+    return update_rollup(rollup, meta, df)
+
+
+def update_rollup(rollup, meta, df):
+    """Fold the rows appended to ``df`` since ``meta`` was written into ``rollup``."""
+    return advance_rollup(rollup, meta, frame_loader(df))
+
+
+def advance_rollup(rollup, meta, load_frames):
+    """``update_rollup`` reading the history in chunks from ``load_frames``."""
+    if not extends(meta, load_frames):
+        rollup, meta = _empty()
+
+    def fold(frame):
+        nonlocal rollup
+        rollup = _merge(rollup, _aggregate(frame))
+
+    rows, tail_hash = fold_frames(load_frames, meta["rows"], fold)
+    if tail_hash is None:
+        return rollup, meta
+    return rollup, {**meta, "rows": rows, "tail_hash": tail_hash}
+
+
+# --- Persistence ---
+def _rollup_path(user_id):
+    return os.path.join(STATE_DIR, f"{user_id}.rollup.arrow")
+
+
+def load_rollup(user_id):
+    path = _rollup_path(user_id)
+    if not os.path.exists(path):
+        return _empty()
+    table = ipc.open_file(pa.memory_map(path)).read_all()
+    meta = json.loads(table.schema.metadata[b"centinel"])
+    if meta.get("version") != ROLLUP_VERSION:
+        return _empty()
+    return table.to_pandas(), meta
+
+
+def save_rollup(user_id, rollup, meta):
+    table = pa.Table.from_pandas(rollup, preserve_index=False)
+    table = table.replace_schema_metadata({"centinel": json.dumps(meta)})
+    with atomic_write(_rollup_path(user_id), "wb") as f, ipc.new_file(f, table.schema) as writer:
+        writer.write_table(table)
+
+
+def refresh_rollup(user_id, load_frames, version):
+    """The user's persisted rollup, brought up to date with their transactions.
+
+    Like ``trigger_state.refresh_state``: ``load_frames`` is only called when
+    ``version`` or the merchant rules changed since the last refresh.
+    """
+    rollup, meta = load_rollup(user_id)
+    rules = list(default_classifier().fingerprint)
+    if meta.get("source_version") == version and meta.get("rules") == rules:
+        return rollup
+    if meta.get("rules") != rules:
+        # Reclassified merchants change existing rows, not just new ones.
+        rollup, meta = _empty()
+    rollup, meta = advance_rollup(rollup, meta, load_frames)
+    meta = {**meta, "source_version": version, "rules": rules}
+    save_rollup(user_id, rollup, meta)
+    return rollup
+
+
+# --- Queries ---
+def window(rollup, start=None, end=None):
+    """Rollup rows with ``start <= day < end``; either bound may be ``None``."""
+    mask = np.ones(len(rollup), dtype=bool)
+    if start is not None:
+        mask &= (rollup["day"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (rollup["day"] < pd.Timestamp(end)).to_numpy()
+    return rollup[mask]
+
+
+def resolution(days):
+    """Bucket size ("D", "W" or "M") that keeps ``days`` under ``MAX_POINTS`` points."""
+    if days.empty or pd.isna(days.min()):
+        return "D"
+    span = (days.max() - days.min()).days + 1
+    if span <= MAX_POINTS:
+        return "D"
+    if span <= MAX_POINTS * 7:
+        return "W"
+    return "M"
+
+
+def bucket(days, freq):
+    """Start date of each day's bucket: the day, its Monday, or its month's first."""
+    if freq == "W":
+        days = days - pd.to_timedelta(days.dt.weekday, unit="D")
+    elif freq == "M":
+        days = days.dt.to_period("M").dt.start_time
+    return days.dt.date
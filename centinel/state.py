@@ -0,0 +1,63 @@
+"""Where derived state lives, and how files are replaced atomically.
+
+    with atomic_write(path, newline="") as f:
+        frame.to_csv(f, index=False)
+    write_json(_state_path(user_id), state)
+
+``atomic_write`` writes to a temp file next to ``path`` and renames it over
+``path`` only once the write finished, so readers see the old file or the
+new one, never a partial one. The replacement keeps ``path``'s permission
+bits (a new file gets the umask's default, or 0644 where the umask cannot be
+read), so rewriting a tracked CSV does not leave it readable by its owner
+only.
+"""
+import json
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+STATE_DIR = os.environ.get("CENTINEL_STATE_DIR", ".centinel_state")
+
+
+def _umask():
+    # Not os.umask: querying it means setting it, which races with files
+    # other threads create meanwhile.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    return 0o022
+
+
+def _mode(path):
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_umask()
+
+
+@contextmanager
+def atomic_write(path, mode="w", **kwargs):
+    """A file object whose contents replace ``path`` when the block exits cleanly."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.chmod(tmp, _mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_json(path, value, **kwargs):
+    """``json.dump`` ``value`` to ``path`` atomically."""
+    with atomic_write(path) as f:
+        json.dump(value, f, **kwargs)
@@ -0,0 +1,262 @@
+"""Incremental per-user trigger state for append-only transaction feeds.
+
+The state keeps one entry per calendar week (Monday to Sunday, the same weeks
+``subscription_overlap`` groups by). Each week holds day buckets with category
+sums, merchant-class counts, salary counts and the subscription merchants
+seen that day. Day resolution is kept because the persistence windows roll
+with the latest transaction date instead of following calendar weeks.
+
+When the feed grows, only the appended rows are folded into the buckets they
+touch. They are read through a ``load_frames(first_row, last_row=None)``
+callable yielding chunks of rows indexed by row number (such as
+``txstore.iter_transactions``), so neither an update nor a rebuild holds the
+whole history in memory. Weeks that fall out of the retention horizon are evicted. The trigger
+matrix for any window inside the horizon can be rebuilt from the buckets
+alone, without rereading the history. Transactions are assumed to be dated
+by day, as in the CSV exports.
+"""
+import json
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from centinel.state import STATE_DIR, write_json
+from centinel.triggers import FREQUENT_WITHDRAWALS, HIGH_DINING_SPEND, LOW_SAVINGS, TRIGGERS, row_features, trigger_matrix
+
+STATE_VERSION = 1
+# The oldest window the dashboard reads is past_month, 60 days back.
+RETENTION_DAYS = 61
+
+
+def _empty_state():
+    return {"version": STATE_VERSION, "rows": 0, "tail_hash": None, "today": None, "weeks": {}}
+
+
+def row_hash(df, pos):
+    return str(int(pd.util.hash_pandas_object(df.iloc[[pos]], index=False).iloc[0]))
+
+
+def frame_loader(df):
+    """A ``load_frames`` over an in-memory history whose rows are numbered by position."""
+    def load_frames(first_row=0, last_row=None):
+        part = df.iloc[first_row:last_row]
+        yield part.set_axis(range(first_row, first_row + len(part)))
+    return load_frames
+
+
+def extends(meta, load_frames):
+    """Whether the ``meta["rows"]`` rows consumed so far still end in the same row."""
+    consumed = meta["rows"]
+    if not consumed:
+        return True
+    frames = [frame for frame in load_frames(consumed - 1, consumed) if len(frame)]
+    return len(frames) == 1 and len(frames[0]) == 1 and row_hash(frames[0], 0) == meta["tail_hash"]
+
+
+def fold_frames(load_frames, first_row, fold):
+    """Call ``fold`` on every chunk from ``first_row`` on.
+
+    Returns ``(rows, tail_hash)`` for the end of the history, or
+    ``(first_row, None)`` when nothing was appended.
+    """
+    rows, tail_hash = first_row, None
+    for frame in load_frames(first_row):
+        if frame.empty:
+            continue
+        fold(frame)
+        last = frame.index.max()
+        if last + 1 > rows:
+            rows, tail_hash = int(last) + 1, row_hash(frame, frame.index.get_loc(last))
+    return rows, tail_hash
+
+
+def _week_id(day):
+    # Same numbering as the W-SUN periods used by the trigger engine.
+    return str((day - pd.Timestamp("1970-01-05")).days // 7)
+
+
+def _fold(state, rows):
+    """Aggregate ``rows`` into day buckets and merge them into ``state``."""
+    rows = rows[rows["Date"].notna()]
+    if rows.empty:
+        return
+    features = row_features(rows)
+    days = rows["Date"].dt.normalize()
+    tagged = pd.DataFrame({
+        "day": days.to_numpy(),
+        "category": rows["Category"].to_numpy(dtype=object),
+        "merchant": rows["Merchant"].to_numpy(dtype=object),
+        "amount": features["amount"],
+        "withdrawals": features["withdrawal"].astype(int),
+        "crypto": features["crypto"].astype(int),
+        "investment": features["investment"].astype(int),
+        "salary": features["salary"].astype(int),
+    })
+    category_sums = tagged.dropna(subset=["category"]).groupby(["day", "category"])["amount"].sum()
+    counts = tagged.groupby("day")[["withdrawals", "crypto", "investment", "salary"]].sum()
+    subs = tagged[features["subscription"]].dropna(subset=["merchant"]).groupby("day")["merchant"].unique()
+
+    for day, row in counts.iterrows():
+        week = state["weeks"].setdefault(_week_id(day), {})
+        bucket = week.setdefault(day.date().isoformat(), {
+            "categories": {}, "withdrawals": 0, "crypto": 0, "investment": 0, "salary": 0, "subscriptions": [],
+        })
+        for field in ("withdrawals", "crypto", "investment", "salary"):
+            bucket[field] += int(row[field])
+        if day in subs.index:
+            bucket["subscriptions"] = sorted(set(bucket["subscriptions"]) | set(subs[day]))
+    for (day, category), amount in category_sums.items():
+        categories = state["weeks"][_week_id(day)][day.date().isoformat()]["categories"]
+        categories[category] = categories.get(category, 0.0) + float(amount)
+
+    latest = days.max()
+    if state["today"] is None or latest > pd.Timestamp(state["today"]):
+        state["today"] = latest.date().isoformat()
+
+
+def _evict(state):
+    if state["today"] is None:
+        return
+    horizon = pd.Timestamp(state["today"]) - timedelta(days=RETENTION_DAYS)
+    for week_id in list(state["weeks"]):
+        last_day = pd.Timestamp("1970-01-05") + timedelta(days=int(week_id) * 7 + 6)
+        if last_day < horizon:
+            del state["weeks"][week_id]
+
+
+def rebuild_state(df):
+    """Build a fresh state from the full transaction history."""
+    state = _empty_state()
+    return update_state(state, df)
+
+
+def update_state(state, df):
+    """Fold rows appended to ``df`` since the last update into ``state``.
+
+    Falls back to a full rebuild when ``df`` is no longer an extension of
+    the rows already consumed, e.g. after the export was rewritten.
+    """
+    return advance_state(state, frame_loader(df))
+
+
+def advance_state(state, load_frames):
+    """``update_state`` reading the history in chunks from ``load_frames``."""
+    if not extends(state, load_frames):
+        state = _empty_state()
+
+    def fold(new_rows):
+        latest = new_rows["Date"].max()
+        if state["today"] is not None and not latest > pd.Timestamp(state["today"]):
+            latest = pd.Timestamp(state["today"])
+        if pd.notna(latest):
+            # Rows older than the horizon could only land in evicted weeks.
+            new_rows = new_rows[new_rows["Date"] >= latest - timedelta(days=RETENTION_DAYS)]
+        _fold(state, new_rows)
+        _evict(state)
+
+    rows, tail_hash = fold_frames(load_frames, state["rows"], fold)
+    if tail_hash is not None:
+        state["rows"], state["tail_hash"] = rows, tail_hash
+    return state
+
+
+def _day_frame(state):
+    records = []
+    for week_id, days in state["weeks"].items():
+        for day, bucket in days.items():
+            categories = bucket["categories"]
+            records.append({
+                "day": pd.Timestamp(day),
+                "week": int(week_id),
+                "dining": categories.get("Dining Out", 0.0),
+                "savings": categories.get("Savings", 0.0),
+                "withdrawals": bucket["withdrawals"],
+                "crypto": bucket["crypto"],
+                "investment": bucket["investment"],
+                "salary": bucket["salary"],
+                "subscriptions": bucket["subscriptions"],
+            })
+    frame = pd.DataFrame(records, columns=[
+        "day", "week", "dining", "savings", "withdrawals", "crypto", "investment", "salary", "subscriptions",
+    ])
+    return frame.sort_values("day")
+
+
+def state_matrix(state, windows, modules_df):
+    """Window x trigger matrix derived from the state's day buckets.
+
+    Matches ``trigger_matrix`` for every window that starts inside the
+    retention horizon.
+    """
+    days = _day_frame(state)
+    has_budgeting = "Budgeting 101" in modules_df["title"].values
+    rows = {}
+    for name, (start, end, closed) in windows.items():
+        mask = np.ones(len(days), dtype=bool)
+        if start is not None:
+            mask &= (days["day"] >= start) if closed == "left" else (days["day"] > start)
+        if end is not None:
+            mask &= (days["day"] < end) if closed == "left" else (days["day"] <= end)
+        window = days[mask]
+        salary_months = window.loc[window["salary"] > 0, "day"].dt.to_period("M").nunique()
+        overlap = window.groupby("week")["subscriptions"].agg(lambda sets: len(set().union(*sets))).max()
+        rows[name] = {
+            "high_spending": window["dining"].sum() < HIGH_DINING_SPEND,
+            "low_savings": window["savings"].sum() < LOW_SAVINGS,
+            "crypto_interest": window["crypto"].sum() > 0,
+            "frequent_withdrawals": window["withdrawals"].sum() >= FREQUENT_WITHDRAWALS,
+            "no_budgeting_history": not has_budgeting,
+            "new_investment_activity": window["investment"].sum() > 0,
+            "unstable_income": salary_months < 2,
+            "subscription_overlap": bool(overlap >= 2) if not window.empty else False,
+        }
+    matrix = pd.DataFrame.from_dict(rows, orient="index")[TRIGGERS].astype(bool)
+    matrix.index.name = "window"
+    return matrix
+
+
+def verify_state(state, df, windows, modules_df):
+    """Compare the state against a full recompute over ``df``.
+
+    Returns the list of ``(window, trigger)`` pairs that disagree; an empty
+    list means the state is consistent.
+    """
+    expected = trigger_matrix(df, windows, modules_df)
+    actual = state_matrix(state, windows, modules_df)
+    diff = expected != actual
+    return [(window, trig) for window in diff.index for trig in TRIGGERS if diff.at[window, trig]]
+
+
+def refresh_state(user_id, load_frames, version):
+    """Return the user's saved state, brought up to date with their transactions.
+
+    ``version`` identifies the current transaction data (e.g. the source
+    file fingerprint). ``load_frames`` is only called when it differs from
+    the version the state was last updated against.
+    """
+    state = load_state(user_id)
+    if state.get("source_version") == version:
+        return state
+    state = advance_state(state, load_frames)
+    state["source_version"] = version
+    save_state(user_id, state)
+    return state
+
+
+def _state_path(user_id):
+    return os.path.join(STATE_DIR, f"{user_id}.json")
+
+
+def load_state(user_id):
+    path = _state_path(user_id)
+    if not os.path.exists(path):
+        return _empty_state()
+    with open(path) as f:
+        state = json.load(f)
+    return state if state.get("version") == STATE_VERSION else _empty_state()
+
+
+def save_state(user_id, state):
+    write_json(_state_path(user_id), state)
@@ -0,0 +1,182 @@
+"""Vectorized behavioural trigger detection.
+
+Every transaction is tagged with the ids of the windows it falls into, and all
+eight triggers are then evaluated for all windows in one grouped aggregation.
+The result is a window x trigger boolean matrix; persistence, top triggers and
+newly activated triggers are all read from it. Merchant-based triggers read the
+withdrawal, crypto and investment classes from ``centinel.merchants``.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from centinel.merchants import merchant_flags
+
+TRIGGERS = [
+    "high_spending",
+    "low_savings",
+    "crypto_interest",
+    "frequent_withdrawals",
+    "no_budgeting_history",
+    "new_investment_activity",
+    "unstable_income",
+    "subscription_overlap",
+]
+PERSISTENCE_WINDOWS = ["week_0", "week_1", "week_2"]
+# Thresholds of the sum-based triggers.
+HIGH_DINING_SPEND = -150
+LOW_SAVINGS = 20
+FREQUENT_WITHDRAWALS = 3
+
+# 1970-01-05 was a Monday, so this offset aligns day numbers with W-SUN periods.
+_MONDAY_OFFSET = 4
+
+
+def build_windows(today):
+    """Return the dashboard's named windows as ``(start, end, closed)`` tuples.
+
+    ``closed="left"`` selects ``start <= Date < end``, ``closed="right"``
+    selects ``start < Date <= end``; ``None`` leaves that side unbounded.
+    """
+    windows = {}
+    for i in range(3):
+        windows[f"week_{i}"] = (today - timedelta(days=(i + 1) * 7), today - timedelta(days=i * 7), "left")
+    windows["current_week"] = (today - timedelta(days=7), None, "right")
+    windows["past_month"] = (today - timedelta(days=60), today - timedelta(days=30), "left")
+    return windows
+
+
+def row_features(df):
+    codes, _ = pd.factorize(df["Merchant"])
+    flags = merchant_flags(df)
+    no_match = np.zeros(len(df), dtype=bool)
+    category = df["Category"].to_numpy(dtype=object)
+    days = df["Date"].to_numpy().astype("datetime64[D]")
+    return {
+        "amount": df["Amount"].to_numpy(dtype=float),
+        "dining": category == "Dining Out",
+        "savings": category == "Savings",
+        "salary": category == "Salary",
+        "subscription": category == "Subscriptions",
+        "crypto": flags.get("crypto", no_match),
+        "withdrawal": flags.get("withdrawal", no_match),
+        "investment": flags.get("investment", no_match),
+        "merchant": codes,
+        "month": days.astype("datetime64[M]").astype(np.int64),
+        "week": (days.astype(np.int64) - _MONDAY_OFFSET) // 7,
+    }
+
+
+def _tag_windows(dates, windows):
+    # Sort once, then each window is a contiguous slice found by binary search.
+    valid = ~np.isnat(dates)
+    order = np.flatnonzero(valid)[np.argsort(dates[valid], kind="stable")]
+    sorted_dates = dates[order]
+    positions, window_ids = [], []
+    for wid, (start, end, closed) in enumerate(windows.values()):
+        side = "left" if closed == "left" else "right"
+        lo = 0 if start is None else np.searchsorted(sorted_dates, np.datetime64(start), side=side)
+        hi = len(sorted_dates) if end is None else np.searchsorted(sorted_dates, np.datetime64(end), side=side)
+        # Keep the original row order inside each window so sums match a mask scan.
+        positions.append(np.sort(order[lo:hi]))
+        window_ids.append(np.full(max(hi - lo, 0), wid))
+    return np.concatenate(positions), np.concatenate(window_ids)
+
+
+def trigger_matrix(df, windows, modules_df):
+    """Evaluate every trigger for every window in one pass over ``df``.
+
+    Returns a boolean frame indexed by window name with one column per entry
+    of ``TRIGGERS``. Each row equals what a per-window ``detect_triggers``
+    call would return for the same slice of ``df``.
+    """
+    names = list(windows)
+    features = row_features(df)
+    pos, wid = _tag_windows(df["Date"].to_numpy(), windows)
+    tagged = pd.DataFrame({name: values[pos] for name, values in features.items()})
+    tagged["window"] = wid
+
+    dining = tagged[tagged["dining"]].groupby("window")["amount"].sum()
+    savings = tagged[tagged["savings"]].groupby("window")["amount"].sum()
+    flags = tagged.groupby("window").agg(
+        crypto=("crypto", "any"),
+        withdrawals=("withdrawal", "sum"),
+        investment=("investment", "any"),
+    )
+    salary_months = tagged[tagged["salary"]].groupby("window")["month"].nunique()
+    subs = tagged[tagged["subscription"] & (tagged["merchant"] >= 0)]
+    overlap = subs.groupby(["window", "week"])["merchant"].nunique().groupby(level="window").max()
+
+    index = pd.RangeIndex(len(names))
+    flags = flags.reindex(index, fill_value=0)
+    matrix = pd.DataFrame({
+        "high_spending": dining.reindex(index, fill_value=0) < HIGH_DINING_SPEND,
+        "low_savings": savings.reindex(index, fill_value=0) < LOW_SAVINGS,
+        "crypto_interest": flags["crypto"].astype(bool),
+        "frequent_withdrawals": flags["withdrawals"] >= FREQUENT_WITHDRAWALS,
+        "no_budgeting_history": "Budgeting 101" not in modules_df["title"].values,
+        "new_investment_activity": flags["investment"].astype(bool),
+        "unstable_income": salary_months.reindex(index, fill_value=0) < 2,
+        "subscription_overlap": overlap.reindex(index, fill_value=0) >= 2,
+    }, index=index)
+    matrix.index = pd.Index(names, name="window")
+    return matrix[TRIGGERS]
+
+
+def detect_triggers(data, modules_df):
+    """Return the set of triggers active anywhere in ``data``."""
+    row = trigger_matrix(data, {"all": (None, None, "left")}, modules_df).iloc[0]
+    return set(row[row].index)
+
+
+def count_persistence(matrix, windows=PERSISTENCE_WINDOWS):
+    """Count how many of ``windows`` each trigger was active in.
+
+    Triggers are listed in the order they first appear, week by week, so
+    ties keep the most recent week first when sorted.
+    """
+    counts = {}
+    for window in windows:
+        for trig in TRIGGERS:
+            if matrix.at[window, trig]:
+                counts[trig] = counts.get(trig, 0) + 1
+    return counts
+
+
+def rank_triggers(counts, n=3):
+    return sorted(counts, key=counts.get, reverse=True)[:n]
+
+
+def newly_active_triggers(matrix, current="current_week", previous="past_month"):
+    """Triggers active in ``current`` that were not active in ``previous``."""
+    row = matrix.loc[current] & ~matrix.loc[previous]
+    return set(row[row].index)
+
+
+# Triggers that have a severity measure and a behaviour chart.
+SEVERITY_TRIGGERS = {"high_spending", "low_savings", "frequent_withdrawals", "subscription_overlap", "new_investment_activity"}
+
+
+def trigger_severity(trigger, data):
+    if trigger == "high_spending":
+        return abs(data[data["Amount"] < 0]["Amount"].sum())
+    elif trigger == "low_savings":
+        return abs(data[data["Category"] == "Savings"]["Amount"].sum())
+    elif trigger == "frequent_withdrawals":
+        return merchant_flags(data)["withdrawal"].sum()
+    elif trigger == "subscription_overlap":
+        subs = data[data["Category"] == "Subscriptions"]
+        return subs["Amount"].sum() if not subs.empty else 0
+    elif trigger == "new_investment_activity":
+        return data[data["Category"] == "Investments"]["Amount"].sum()
+    return 0
+
+
+def pick_best_trigger(new, top, current_week):
+    """The trigger to chart: the most severe new one, else the most persistent."""
+    candidates = [t for t in TRIGGERS if t in new and t in SEVERITY_TRIGGERS]
+    if candidates:
+        return max(candidates, key=lambda t: trigger_severity(t, current_week))
+    fallback = [t for t in top if t in SEVERITY_TRIGGERS]
+    return fallback[0] if fallback else None
@@ -0,0 +1,422 @@
+"""Columnar, memory-mapped transaction store.
+
+Each user's transaction CSV (as registered in ``USER_FILES``) is converted
+into Arrow IPC files partitioned by user and month::
+
+    .centinel_store/user_id=U001/_manifest.json
+    .centinel_store/user_id=U001/data-k2j4/month=2025-03.arrow
+    .centinel_store/user_id=U001/data-k2j4/month=2025-03.11112.arrow   # appended later
+
+``Category`` and ``Merchant`` are stored dictionary-encoded. The CSV is read
+in chunks (``centinel.ingest``), so converting a multi-GB export never holds
+more than a chunk in memory. The manifest records the byte offset read up
+to. When the CSV has only grown past that offset since the last sync, just
+the appended rows are read and written as extra files for the months they
+touch. Any other change converts the file again, into a new ``data-*``
+directory.
+
+The manifest names the data directory its files live in and is replaced
+atomically, so publishing it is the whole swap: a reader sees the old files
+or the new ones, never a missing directory. The generation before the
+current one is kept until the next conversion, for readers still holding
+its manifest. Syncs take a per-user ``fcntl`` lock where available, so
+several processes can share one store.
+
+Reads memory-map only the files that overlap the requested date range and
+filter the rest in Arrow, so a page that needs two months of data never
+touches the years before it. ``iter_transactions`` streams one record batch
+at a time for callers that fold the history into running aggregates. Rows
+keep their original CSV order and row number as the frame index.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from centinel.data import file_fingerprint
+from centinel.ingest import csv_columns, read_chunks
+from centinel.state import write_json
+
+try:
+    import fcntl
+except ImportError:  # optional: only needed when several processes sync one store
+    fcntl = None
+
+STORE_DIR = os.environ.get("CENTINEL_STORE_DIR", ".centinel_store")
+STORE_VERSION = 3
+DICTIONARY_COLUMNS = ["Category", "Merchant"]
+UNDATED = "undated"
+# Bytes before the saved offset that must be unchanged for an append.
+TAIL_CHECK_BYTES = 4096
+# Past this many appended files, the next change converts the CSV afresh.
+MAX_APPENDED_FILES = 64
+
+_lock = threading.Lock()  # guards _user_locks
+_user_locks = {}  # lock file path -> threading.Lock for that user's syncs
+_WRITE_OPTIONS = ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+
+
+def _user_dir(user_id, root):
+    return os.path.join(root, f"user_id={user_id}")
+
+
+def _data_dir(user_dir, manifest):
+    return os.path.join(user_dir, manifest["data"])
+
+
+@contextmanager
+def _user_lock(user_id, root):
+    """Exclusive per-user sync lock, across threads and processes."""
+    path = os.path.abspath(os.path.join(root, f"user_id={user_id}.lock"))
+    with _lock:
+        lock = _user_locks.setdefault(path, threading.Lock())
+    with lock:
+        os.makedirs(root, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # also releases the flock
+
+
+def _read_manifest(user_dir):
+    try:
+        with open(os.path.join(user_dir, "_manifest.json")) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    return manifest if manifest.get("version") == STORE_VERSION else None
+
+
+def _write_manifest(user_dir, manifest):
+    write_json(os.path.join(user_dir, "_manifest.json"), manifest)
+
+
+def _tail_digest(path, offset):
+    with open(path, "rb") as f:
+        f.seek(max(offset - TAIL_CHECK_BYTES, 0))
+        data = f.read(min(offset, TAIL_CHECK_BYTES))
+    return hashlib.sha1(data).hexdigest(), data.endswith(b"\n")
+
+
+class _Dictionary:
+    """Append-only value -> code map shared by every file of one conversion.
+
+    Each batch is encoded against the values seen so far, so a file's later
+    dictionaries only ever extend its earlier ones (IPC dictionary deltas).
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, column):
+        labels = pd.Categorical(column)
+        for value in labels.categories:
+            if value not in self.codes:
+                self.codes[value] = len(self.values)
+                self.values.append(value)
+        mapping = np.array([self.codes[v] for v in labels.categories] or [0], dtype=np.int32)
+        # Missing values (code -1) pick an arbitrary entry and are masked out.
+        indices = pa.array(mapping[labels.codes], mask=labels.codes < 0)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(self.values, type=pa.string()))
+
+
+def _schema(columns):
+    fields = [pa.field("row", pa.int64())]
+    for name in columns:
+        if name == "Date":
+            fields.append(pa.field(name, pa.timestamp("us")))
+        elif name == "Amount":
+            fields.append(pa.field(name, pa.float64()))
+        elif name in DICTIONARY_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def _to_batch(frame, schema, dictionaries):
+    arrays = []
+    for field in schema:
+        if field.name in DICTIONARY_COLUMNS:
+            arrays.append(dictionaries[field.name].encode(frame[field.name]))
+        else:
+            arrays.append(pa.array(frame[field.name], type=field.type, from_pandas=True))
+    return pa.record_batch(arrays, schema=schema)
+
+
+class _PartitionWriter:
+    """Open IPC files, one per month, that chunks are appended to as batches."""
+
+    def __init__(self, directory, schema, suffix=""):
+        self.directory = directory
+        self.schema = schema
+        self.suffix = suffix
+        self.dictionaries = {name: _Dictionary() for name in DICTIONARY_COLUMNS}
+        self.files = {}  # month -> [sink, writer, entry]
+
+    def write(self, frame):
+        # Integer yyyymm keys: formatting every date with strftime is far slower.
+        dates = frame["Date"]
+        keys = (dates.dt.year * 100 + dates.dt.month).fillna(0).astype(int)
+        for key, part in frame.groupby(keys.to_numpy(), sort=False):
+            month = f"{key // 100:04d}-{key % 100:02d}" if key else UNDATED
+            if month not in self.files:
+                name = f"month={month}{self.suffix}.arrow"
+                sink = pa.OSFile(os.path.join(self.directory, name), "wb")
+                writer = ipc.new_file(sink, self.schema, options=_WRITE_OPTIONS)
+                entry = {"file": name, "rows": 0, "first_row": None, "last_row": None, "min": None, "max": None}
+                self.files[month] = [sink, writer, entry]
+            sink, writer, entry = self.files[month]
+            writer.write_batch(_to_batch(part, self.schema, self.dictionaries))
+            entry["rows"] += len(part)
+            rows = part["row"]
+            entry["first_row"] = int(rows.min()) if entry["first_row"] is None else min(entry["first_row"], int(rows.min()))
+            entry["last_row"] = int(rows.max()) if entry["last_row"] is None else max(entry["last_row"], int(rows.max()))
+            if month != UNDATED:
+                low, high = part["Date"].min().isoformat(), part["Date"].max().isoformat()
+                entry["min"] = low if entry["min"] is None else min(entry["min"], low)
+                entry["max"] = high if entry["max"] is None else max(entry["max"], high)
+
+    def close(self):
+        entries = {}
+        for month, (sink, writer, entry) in self.files.items():
+            writer.close()
+            sink.close()
+            entries[month] = entry
+        return entries
+
+
+def _ingest(csv_path, directory, manifest, suffix=""):
+    """Stream the CSV rows after ``manifest["offset"]`` into new files in ``directory``."""
+    writer = _PartitionWriter(directory, _schema(manifest["columns"]), suffix)
+    rows, offset, latest = manifest["rows"], manifest["offset"], manifest["max_date"]
+    try:
+        for frame, offset in read_chunks(csv_path, offset, manifest["columns"]):
+            frame.insert(0, "row", np.arange(rows, rows + len(frame), dtype=np.int64))
+            rows += len(frame)
+            writer.write(frame)
+            if frame["Date"].notna().any():
+                high = frame["Date"].max().isoformat()
+                latest = high if latest is None else max(latest, high)
+    finally:
+        entries = writer.close()
+    for month, entry in entries.items():
+        part = manifest["partitions"].setdefault(month, {"files": [], "rows": 0, "min": None, "max": None})
+        part["files"].append(entry)
+        part["rows"] += entry["rows"]
+        for bound, pick in (("min", min), ("max", max)):
+            if entry[bound] is not None:
+                part[bound] = entry[bound] if part[bound] is None else pick(part[bound], entry[bound])
+    digest, terminated = _tail_digest(csv_path, offset)
+    manifest.update(rows=rows, offset=offset, max_date=latest, tail=digest, terminated=terminated)
+    return manifest
+
+
+def convert(user_id, csv_path, root=STORE_DIR):
+    """Rewrite ``user_id``'s partitions from ``csv_path`` into a new data directory.
+
+    Returns the manifest. Use ``sync_user`` when other threads or processes
+    may sync the same user; it holds the user's lock around this.
+    """
+    source = list(file_fingerprint(csv_path))
+    user_dir = _user_dir(user_id, root)
+    os.makedirs(user_dir, exist_ok=True)
+    previous = _read_manifest(user_dir)
+    data = tempfile.mkdtemp(dir=user_dir, prefix="data-")
+    manifest = {
+        "version": STORE_VERSION, "source": source, "data": os.path.basename(data),
+        "rows": 0, "max_date": None, "partitions": {},
+    }
+    manifest["columns"], manifest["offset"] = csv_columns(csv_path)
+    _ingest(csv_path, data, manifest)
+    manifest["partitions"] = dict(sorted(manifest["partitions"].items()))
+    _write_manifest(user_dir, manifest)
+
+    # Everything but the new and the previous generation (and the manifest)
+    # is left over from older conversions, crashed ones or older layouts.
+    keep = {"_manifest.json", manifest["data"], previous["data"] if previous else None}
+    for name in os.listdir(user_dir):
+        if name not in keep:
+            path = os.path.join(user_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+    return manifest
+
+
+def _appendable(manifest, csv_path):
+    """Whether ``csv_path`` only grew past the offset ``manifest`` was read up to."""
+    size = os.path.getsize(csv_path)
+    if size <= manifest["offset"]:
+        return False
+    if sum(len(part["files"]) for part in manifest["partitions"].values()) >= MAX_APPENDED_FILES:
+        return False
+    if _tail_digest(csv_path, manifest["offset"])[0] != manifest["tail"]:
+        return False
+    if not manifest["terminated"]:
+        # The last row had no newline; it is only complete if one follows it now.
+        with open(csv_path, "rb") as f:
+            f.seek(manifest["offset"])
+            return f.read(1) in (b"\n", b"\r")
+    return True
+
+
+def append(user_id, csv_path, manifest, root=STORE_DIR):
+    """Add the rows appended to ``csv_path`` since ``manifest`` and return the new manifest."""
+    user_dir = _user_dir(user_id, root)
+    manifest = json.loads(json.dumps(manifest))
+    manifest["source"] = list(file_fingerprint(csv_path))
+    # New files only: readers of the old manifest never look at them.
+    _ingest(csv_path, _data_dir(user_dir, manifest), manifest, suffix=f".{manifest['offset']}")
+    manifest["partitions"] = dict(sorted(manifest["partitions"].items()))
+    _write_manifest(user_dir, manifest)
+    return manifest
+
+
+def sync_user(user_id, csv_path, root=STORE_DIR):
+    """Make sure the store reflects ``csv_path``.
+
+    Unchanged files cost a ``stat``, grown files only have their new rows
+    read, and anything else is converted again.
+    """
+    manifest = _read_manifest(_user_dir(user_id, root))
+    if manifest is not None and tuple(manifest["source"]) == file_fingerprint(csv_path):
+        return manifest
+    with _user_lock(user_id, root):
+        manifest = _read_manifest(_user_dir(user_id, root))
+        if manifest is not None and tuple(manifest["source"]) == file_fingerprint(csv_path):
+            return manifest
+        if manifest is not None and _appendable(manifest, csv_path):
+            return append(user_id, csv_path, manifest, root)
+        return convert(user_id, csv_path, root)
+
+
+def sync_all(user_files, root=STORE_DIR):
+    """Sync every user registered in a ``USER_FILES``-style mapping."""
+    return {user_id: sync_user(user_id, files["transactions"], root) for user_id, files in user_files.items()}
+
+
+def _overlaps(entry, start, end):
+    if entry["min"] is None:
+        return start is None and end is None
+    if start is not None and pd.Timestamp(entry["max"]) < start:
+        return False
+    if end is not None and pd.Timestamp(entry["min"]) >= end:
+        return False
+    return True
+
+
+def _open(user_id, root):
+    user_dir = _user_dir(user_id, root)
+    manifest = _read_manifest(user_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"no transaction store for {user_id}; run sync_user first")
+    return _data_dir(user_dir, manifest), manifest
+
+
+def _files(data_dir, manifest, start, end, first_row, last_row):
+    for part in manifest["partitions"].values():
+        if not _overlaps(part, start, end):
+            continue
+        for entry in part["files"]:
+            if not _overlaps(entry, start, end) or entry["last_row"] < first_row:
+                continue
+            if last_row is not None and entry["first_row"] >= last_row:
+                continue
+            yield os.path.join(data_dir, entry["file"])
+
+
+def _filter(table, start, end, first_row, last_row):
+    if start is not None:
+        table = table.filter(pc.greater_equal(table["Date"], pa.scalar(start, type=table["Date"].type)))
+    if end is not None:
+        table = table.filter(pc.less(table["Date"], pa.scalar(end, type=table["Date"].type)))
+    if first_row:
+        table = table.filter(pc.greater_equal(table["row"], first_row))
+    if last_row is not None:
+        table = table.filter(pc.less(table["row"], last_row))
+    return table
+
+
+def _to_frame(table):
+    table = table.take(pc.sort_indices(table["row"]))
+    frame = table.to_pandas().set_index("row").rename_axis(None)
+    for name in DICTIONARY_COLUMNS:
+        # Only the values present (a file's dictionary spans every chunk of
+        # its conversion), in alphabetical order so groupby output orders like
+        # plain strings.
+        labels = frame[name].cat.remove_unused_categories()
+        frame[name] = labels.cat.reorder_categories(sorted(labels.cat.categories))
+    return frame
+
+
+def _bounds(start, end):
+    return None if start is None else pd.Timestamp(start), None if end is None else pd.Timestamp(end)
+
+
+def read_transactions(user_id, start=None, end=None, root=STORE_DIR):
+    """Return ``user_id``'s transactions with ``start <= Date < end``.
+
+    Either bound may be ``None``. Undated rows are only returned when both
+    are. ``Category`` and ``Merchant`` come back as pandas categoricals.
+    """
+    data_dir, manifest = _open(user_id, root)
+    start, end = _bounds(start, end)
+    # The tables' buffers point straight into the mappings; nothing is copied here.
+    tables = [
+        ipc.open_file(pa.memory_map(path)).read_all()
+        for path in _files(data_dir, manifest, start, end, 0, None)
+    ]
+    if not tables:
+        return pd.DataFrame({
+            "Date": pd.Series(dtype="datetime64[us]"),
+            "Category": pd.Categorical([]),
+            "Merchant": pd.Categorical([]),
+            "Amount": pd.Series(dtype=float),
+        })
+    return _to_frame(_filter(pa.concat_tables(tables), start, end, 0, None))
+
+
+def iter_transactions(user_id, first_row=0, last_row=None, start=None, end=None, root=STORE_DIR):
+    """Yield ``user_id``'s transactions with ``first_row <= row < last_row`` in bounded chunks.
+
+    Frames are shaped like ``read_transactions`` output, one per stored
+    record batch (at most one ingest chunk), in no particular order. Only
+    files holding rows in range are opened, so reading the rows appended
+    since the last refresh skips the rest of the history. ``start`` and
+    ``end`` filter by date as in ``read_transactions``.
+    """
+    data_dir, manifest = _open(user_id, root)
+    start, end = _bounds(start, end)
+    for path in _files(data_dir, manifest, start, end, first_row, last_row):
+        reader = ipc.open_file(pa.memory_map(path))
+        for i in range(reader.num_record_batches):
+            table = _filter(pa.Table.from_batches([reader.get_batch(i)]), start, end, first_row, last_row)
+            if table.num_rows:
+                yield _to_frame(table)
+
+
+def max_date(manifest):
+    return None if manifest["max_date"] is None else pd.Timestamp(manifest["max_date"])
+
+
+def file_dates(manifest):
+    """Earliest date (ISO string, ``None`` if undated) of every file in the store."""
+    return {
+        f"{manifest['data']}/{entry['file']}": entry["min"]
+        for part in manifest["partitions"].values() for entry in part["files"]
+    }
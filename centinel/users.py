@@ -0,0 +1,234 @@
+"""SQLite user directory behind the Friends page and profile lookups.
+
+Profiles are imported from the per-user CSVs into ``.centinel_users.db``
+the first time they are seen, and again whenever one of those CSVs changes
+on disk. Profile edits reach it through ``centinel.profiles``, which applies
+them here and writes the changed rows back to their CSVs. Friends reads a
+single page or leaderboard slice through the indexes on ``user_id``,
+``xp_points`` and ``streak_days``, so its cost does not grow with the number
+of users.
+"""
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from centinel.data import file_fingerprint
+from centinel.registry import PROFILE_FILES
+from centinel.state import atomic_write
+
+DB_PATH = os.environ.get("CENTINEL_USER_DB", ".centinel_users.db")
+COLUMNS = [
+    "user_id", "name", "level", "goal_tags", "has_premium", "token_balance", "current_path",
+    "xp_points", "streak_days", "achievements", "date_achievement",
+]
+INTEGER_COLUMNS = {"token_balance", "xp_points", "streak_days"}
+# Leaderboard name -> indexed column.
+LEADERBOARDS = {"xp": "xp_points", "streak": "streak_days"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT,
+    level TEXT,
+    goal_tags TEXT,
+    has_premium INTEGER,
+    token_balance INTEGER,
+    current_path TEXT,
+    xp_points INTEGER,
+    streak_days INTEGER,
+    achievements TEXT,
+    date_achievement TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS users_by_xp ON users (xp_points DESC, user_id);
+CREATE INDEX IF NOT EXISTS users_by_streak ON users (streak_days DESC, user_id);
+CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS applied_batches (name TEXT PRIMARY KEY);
+"""
+
+
+def _to_bool(value):
+    return value if isinstance(value, bool) else str(value).strip().lower() == "true"
+
+
+def _csv_records(path):
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for row in frame.reindex(columns=COLUMNS, fill_value="").itertuples(index=False):
+        record = [None if value == "" else value for value in row]
+        for i, column in enumerate(COLUMNS):
+            if record[i] is None:
+                continue
+            if column == "has_premium":
+                record[i] = int(_to_bool(record[i]))
+            elif column in INTEGER_COLUMNS:
+                record[i] = int(float(record[i]))
+        yield record
+
+
+def _from_row(row):
+    record = dict(zip(COLUMNS, row))
+    record["has_premium"] = bool(record["has_premium"])
+    return record
+
+
+def check_fields(fields):
+    unknown = set(fields) - set(COLUMNS[1:])
+    if unknown:
+        raise ValueError(f"unknown profile fields: {sorted(unknown)}")
+
+
+def _apply(conn, user_id, fields, deltas):
+    check_fields(fields)
+    check_fields(deltas)
+    fields = dict(fields)
+    if "has_premium" in fields:
+        fields["has_premium"] = int(_to_bool(fields["has_premium"]))
+    assignments = [f"{column} = ?" for column in fields]
+    assignments += [f"{column} = COALESCE({column}, 0) + ?" for column in deltas]
+    if not assignments:
+        return conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is not None
+    cursor = conn.execute(
+        f"UPDATE users SET {', '.join(assignments)} WHERE user_id = ?",
+        (*fields.values(), *deltas.values(), user_id),
+    )
+    return cursor.rowcount > 0
+
+
+class UserDirectory:
+    """Indexed store of user profiles, kept in sync with their source CSVs."""
+
+    def __init__(self, path=DB_PATH, sources=PROFILE_FILES):
+        self.path = path
+        self.sources = list(sources)
+        self._local = threading.local()
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # sqlite3 connections are per thread; Streamlit runs each session in its own.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def sync(self):
+        """Re-import any source CSV that changed since it was last imported."""
+        changed = []
+        for path in self.sources:
+            fingerprint = file_fingerprint(path)
+            if self._seen.get(path) != fingerprint:
+                changed.append((path, fingerprint))
+        if not changed:
+            return
+        conn = self._connection()
+        with self._lock, conn:
+            for path, (abspath, mtime_ns, size) in changed:
+                stored = conn.execute("SELECT mtime_ns, size FROM sources WHERE path = ?", (abspath,)).fetchone()
+                if stored != (mtime_ns, size):
+                    self.import_csv(path, conn)
+                    conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (abspath, mtime_ns, size))
+                self._seen[path] = (abspath, mtime_ns, size)
+
+    def import_csv(self, path, conn=None):
+        """Upsert every profile row in ``path``."""
+        conn = conn or self._connection()
+        placeholders = ", ".join("?" * len(COLUMNS))
+        conn.executemany(f"INSERT OR REPLACE INTO users VALUES ({placeholders})", _csv_records(path))
+
+    def get(self, user_id):
+        """The user's profile as a Series (like a CSV row), or ``None``."""
+        self.sync()
+        row = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return None if row is None else pd.Series(_from_row(row), name=0)
+
+    def friends(self, user_id, page=0, per_page=20):
+        """One page of other users in ``user_id`` order.
+
+        Returns ``(profiles, has_more)``; ``profiles`` is a list of dicts.
+        """
+        self.sync()
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM users WHERE user_id != ? ORDER BY user_id LIMIT ? OFFSET ?",
+            (user_id, per_page + 1, page * per_page),
+        ).fetchall()
+        return [_from_row(row) for row in rows[:per_page]], len(rows) > per_page
+
+    def leaderboard(self, by="xp", n=10):
+        """Top ``n`` profiles by XP or streak, ties broken by ``user_id``."""
+        column = LEADERBOARDS[by]
+        self.sync()
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM users ORDER BY {column} DESC, user_id LIMIT ?", (n,)
+        ).fetchall()
+        return [_from_row(row) for row in rows]
+
+    def update(self, user_id, **fields):
+        """Update some of one user's columns; returns whether the user exists."""
+        self.sync()
+        conn = self._connection()
+        with self._lock, conn:
+            return _apply(conn, user_id, fields, {})
+
+    def apply_batch(self, name, updates):
+        """Apply ``{user_id: (fields, deltas)}`` in one transaction, at most once per ``name``.
+
+        ``fields`` are assigned and integer ``deltas`` are added to the
+        current values. Returns ``False`` if the batch was already applied.
+        """
+        self.sync()
+        conn = self._connection()
+        with self._lock, conn:
+            if conn.execute("SELECT 1 FROM applied_batches WHERE name = ?", (name,)).fetchone():
+                return False
+            for user_id, (fields, deltas) in updates.items():
+                _apply(conn, user_id, fields, deltas)
+            conn.execute("INSERT INTO applied_batches VALUES (?)", (name,))
+        return True
+
+    def write_back(self, user_ids):
+        """Rewrite the source CSV rows of ``user_ids`` from the directory.
+
+        Each touched CSV is replaced atomically, and recorded as imported so
+        it is not read back in.
+        """
+        user_ids = set(user_ids)
+        self.sync()
+        conn = self._connection()
+        with self._lock:
+            for path in self.sources:
+                frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+                rows = frame.index[frame["user_id"].isin(user_ids)]
+                if rows.empty:
+                    continue
+                for i in rows:
+                    profile = conn.execute(
+                        f"SELECT {', '.join(COLUMNS)} FROM users WHERE user_id = ?", (frame.at[i, "user_id"],)
+                    ).fetchone()
+                    for column, value in _from_row(profile).items():
+                        if column in frame:
+                            frame.at[i, column] = "" if value is None else str(value)
+                with atomic_write(path, newline="") as f:
+                    frame.to_csv(f, index=False)
+                abspath, mtime_ns, size = file_fingerprint(path)
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (abspath, mtime_ns, size))
+                self._seen[path] = (abspath, mtime_ns, size)
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def user_directory(path=DB_PATH, sources=PROFILE_FILES):
+    key = (os.path.abspath(path), tuple(sources))
+    with _directories_lock:
+        directory = _directories.get(key)
+        if directory is None:
+            directory = _directories[key] = UserDirectory(path, sources)
+    return directory
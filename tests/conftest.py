@@ -0,0 +1,62 @@
+"""Shared fixtures. State, store and user-directory paths point at a scratch
+directory before ``centinel`` is imported, so a test run never writes to the
+working tree."""
+import os
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix="centinel-tests-")
+os.environ.setdefault("CENTINEL_STATE_DIR", os.path.join(SCRATCH, "state"))
+os.environ.setdefault("CENTINEL_STORE_DIR", os.path.join(SCRATCH, "store"))
+os.environ.setdefault("CENTINEL_USER_DB", os.path.join(SCRATCH, "users.db"))
+os.chdir(ROOT)  # rule and catalog files are read relative to the app
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+from benchmarks.generate import MERCHANTS  # noqa: E402
+from centinel.profiles import ProfileLog  # noqa: E402
+from centinel.users import UserDirectory  # noqa: E402
+
+
+def read_transactions(path):
+    frame = pd.read_csv(path)
+    frame["Date"] = pd.to_datetime(frame["Date"])
+    return frame
+
+
+@pytest.fixture(params=["fake_transactions.csv", "fake_transactions2.csv"])
+def export(request):
+    return read_transactions(request.param)
+
+
+def random_transactions(seed, n=400, days=90):
+    """Sparse, unsorted history with a few missing merchants and dates."""
+    rng = np.random.default_rng(seed)
+    pick = rng.integers(0, len(MERCHANTS), n)
+    category = np.array([m[0] for m in MERCHANTS], dtype=object)[pick]
+    merchant = np.array([m[1] for m in MERCHANTS], dtype=object)[pick]
+    merchant[rng.random(n) < 0.02] = None
+    mean = np.array([m[3] for m in MERCHANTS], dtype=float)[pick]
+    amount = (mean + 10 * rng.standard_normal(n)).round(2)
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, days, n), unit="D")
+    frame = pd.DataFrame({"Date": dates, "Category": category, "Merchant": merchant, "Amount": amount})
+    frame.loc[rng.random(n) < 0.01, "Date"] = pd.NaT
+    return frame
+
+
+@pytest.fixture
+def log(tmp_path):
+    """A profile log over scratch copies of the U001/U002 profile files."""
+    for name in ("user_data.csv", "user2_data.csv", "xp_progress.json"):
+        shutil.copy(name, tmp_path / name)
+    sources = [str(tmp_path / "user_data.csv"), str(tmp_path / "user2_data.csv")]
+    user_files = {
+        "U001": {"user": sources[0], "progress": str(tmp_path / "xp_progress.json")},
+        "U002": {"user": sources[1]},
+    }
+    log = ProfileLog(str(tmp_path / "profiles.wal"), UserDirectory(str(tmp_path / "users.db"), sources), user_files)
+    log.compact()
+    return log
@@ -0,0 +1,100 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from centinel.achievements import default_engine, record, refresh_achievements
+from centinel.trigger_state import frame_loader
+from tests.conftest import read_transactions
+from tests.test_trigger_state import chunked_loader
+
+_users = itertools.count()
+
+
+@pytest.fixture
+def user_id():
+    return f"T{next(_users)}"  # fresh progress file per test
+
+
+def profile(**fields):
+    return pd.Series({
+        "name": "Test", "xp_points": 0, "token_balance": 0, "streak_days": 0,
+        "achievements": "", "date_achievement": "", **fields,
+    })
+
+
+def test_first_refresh_seeds_without_paying(log, user_id, export):
+    progress = refresh_achievements(user_id, profile(xp_points=700, streak_days=9), frame_loader(export), "v1", log)
+    assert progress["seeded"]
+    assert progress["unlocked"]  # the history and the profile meet several rules
+    assert log._pending == {}
+    assert log.stats["appended"] == 0
+
+
+def test_only_appended_rows_pay(log):
+    export = read_transactions("fake_transactions.csv")
+    investments = export.index[export["Category"] == "Investments"]
+    history = export.loc[: investments[0] - 1]  # before the first investment
+    user = log.get("U001")
+    refresh_achievements("U001", user, frame_loader(history), "v1", log)
+    progress = refresh_achievements("U001", user, frame_loader(export), "v2", log)
+    assert progress["unlocked"]["new_investment_activity"] == export.at[investments[0], "Date"].strftime("%d/%m/%Y")
+    log.compact()
+    after = log.get("U001")
+    assert "new_investment_activity" in after["achievements"].split(";")
+    xp, tokens = default_engine().rewards(set(after["achievements"].split(";")) - set(user["achievements"].split(";")))
+    assert after["xp_points"] == user["xp_points"] + xp
+    assert after["token_balance"] == user["token_balance"] + tokens
+
+
+def test_unlock_is_dated_by_the_crossing_row(log, user_id):
+    export = read_transactions("fake_transactions.csv")
+    progress = refresh_achievements(user_id, profile(), frame_loader(export), "v1", log)
+    savings = export[export["Category"] == "Savings"]
+    crossed = savings["Date"][savings["Amount"].cumsum().abs() >= 1000].iloc[0]
+    assert progress["unlocked"]["emergency_fund_created"] == crossed.strftime("%d/%m/%Y")
+    diversified = export[export["Category"] == "Investments"].drop_duplicates("Merchant")["Date"].iloc[2]
+    assert progress["unlocked"]["portfolio_diversified"] == diversified.strftime("%d/%m/%Y")
+
+
+@pytest.mark.parametrize("size", [1, 7, 40])
+def test_unlocks_do_not_depend_on_chunking(log, export, size):
+    whole = refresh_achievements(f"whole-{size}", profile(), frame_loader(export), "v1", log)
+    chunked = refresh_achievements(f"chunked-{size}", profile(), chunked_loader(export, size), "v1", log)
+    assert chunked["unlocked"] == whole["unlocked"]
+
+
+def test_monthly_growth_compares_consecutive_months_in_any_order():
+    engine = default_engine()
+    rows = pd.DataFrame({
+        "Date": pd.to_datetime(["2025-01-10", "2025-03-05", "2025-02-07", "2025-02-20"]),
+        "Category": "Savings", "Amount": [100.0, 400.0, 100.0, 20.0],
+    })
+    rule = engine.rules["low_savings_detected"]
+    results = []
+    for order in ([0, 1, 2, 3], [3, 2, 1, 0], [1, 0, 3, 2]):
+        state = None
+        for i in order:
+            state, level, _ = engine._advance(rule, state, rows.iloc[[i]])
+        results.append((state, level))
+    # January -> February grows 1.2x, February -> March 400/120; January -> March is not compared.
+    assert all(result == results[0] for result in results)
+    assert results[0][1] == pytest.approx(400 / 120)
+
+
+@pytest.mark.parametrize("amounts", [[-100.0, 150.0], [100.0, -150.0], [-100.0, -150.0], [0.0, 150.0]])
+def test_monthly_growth_needs_a_positive_month_before(amounts):
+    engine = default_engine()
+    rule = engine.rules["low_savings_detected"]
+    rows = pd.DataFrame({"Date": pd.to_datetime(["2025-01-10", "2025-02-10"]), "Category": "Savings", "Amount": amounts})
+    state, level, crossed = engine._advance(rule, None, rows)
+    assert level <= 0 and crossed is None
+
+
+def test_reported_events_pay(log):
+    user = log.get("U002")
+    unlocked = record("U002", "friend_added", user, log=log)
+    assert unlocked == ["friend"]
+    assert record("U002", "friend_added", user, log=log) == []
+    log.compact()
+    assert log.get("U002")["xp_points"] == user["xp_points"] + default_engine().rules["friend"]["xp"]
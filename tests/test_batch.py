@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from centinel.batch import load_precomputed, run_batch, summarize_user
+from centinel.data import load_csv
+from centinel.engine import analyze
+from centinel.registry import load_registry
+
+SEEDS = ["persistence", "top_triggers", "best_trigger", "top_modules", "top_challenges"]
+
+
+@pytest.fixture
+def registry(tmp_path):
+    for user_id, (user, transactions) in {
+        "B1": ("user_data.csv", "fake_transactions.csv"),
+        "B2": ("user2_data.csv", "fake_transactions2.csv"),
+    }.items():
+        folder = tmp_path / "users" / user_id
+        folder.mkdir(parents=True)
+        shutil.copy(user, folder / "user.csv")
+        shutil.copy(transactions, folder / "transactions.csv")
+    return load_registry(str(tmp_path / "users"))
+
+
+def test_results_file_seeds_the_dashboard(registry, tmp_path):
+    out = str(tmp_path / "results.json")
+    stats = run_batch(registry, out, workers=2)
+    assert stats["users"] == 2 and stats["failed"] == {}
+    assert not os.path.exists(f"{out}.partial")
+    with open(out) as f:
+        results = json.load(f)
+    assert set(results) == {"generated", "users"}
+    assert set(results["users"]) == {"B1", "B2"}
+    assert set(results["users"]["B1"]) == {"user_id", "inputs"} | set(SEEDS)
+
+    files = registry["B1"]
+    user = load_csv(files["user"]).iloc[0]
+    seeds = load_precomputed("B1", user, files, path=out)
+    live = analyze("B1", *SEEDS, user=user, transactions_path=files["transactions"])
+    for name in ("persistence", "top_triggers", "best_trigger"):
+        assert seeds[name] == live[name]
+    for name in ("top_modules", "top_challenges"):
+        pd.testing.assert_frame_equal(seeds[name], live[name], check_dtype=False)
+
+
+def test_changed_inputs_are_not_seeded(registry, tmp_path):
+    out = str(tmp_path / "results.json")
+    run_batch(registry, out, workers=1)
+    files = registry["B1"]
+    user = load_csv(files["user"]).iloc[0].copy()
+    user["goal_tags"] = "something_else"
+    assert load_precomputed("B1", user, files, path=out) == {}
+    assert load_precomputed("B9", user, files, path=out) == {}
+
+
+def test_resume_skips_checkpointed_users(registry, tmp_path):
+    out = str(tmp_path / "results.json")
+    done = summarize_user("B1", registry["B1"])
+    stale = {**summarize_user("B2", registry["B2"]), "best_trigger": "stale"}
+    stale["inputs"] = {**stale["inputs"], "user": ["changed"]}
+    with open(f"{out}.partial", "w") as f:
+        f.write(json.dumps({**done, "best_trigger": "from-checkpoint"}) + "\n")
+        f.write(json.dumps(stale) + "\n")
+        f.write('{"user_id": "B2", "inp')  # torn by a crash
+
+    stats = run_batch(registry, out, workers=1)
+    assert stats["users"] == 1  # B2 again: its inputs changed since
+    with open(out) as f:
+        users = json.load(f)["users"]
+    assert users["B1"]["best_trigger"] == "from-checkpoint"
+    assert users["B2"]["best_trigger"] != "stale"
+
+
+def test_fresh_ignores_the_checkpoint(registry, tmp_path):
+    out = str(tmp_path / "results.json")
+    entry = {**summarize_user("B1", registry["B1"]), "best_trigger": "from-checkpoint"}
+    with open(f"{out}.partial", "w") as f:
+        f.write(json.dumps(entry) + "\n")
+    assert run_batch(registry, out, workers=1, fresh=True)["users"] == 2
+    with open(out) as f:
+        assert json.load(f)["users"]["B1"]["best_trigger"] != "from-checkpoint"
@@ -0,0 +1,38 @@
+import html
+
+import pandas as pd
+
+from centinel.cards import bundle_cards, card_grid, friend_cards, module_cards
+from centinel.data import load_csv
+
+NAME = "<script>alert('x')</script> & \"Co\""
+
+
+def test_friend_names_are_escaped():
+    [card] = friend_cards([{"name": NAME, "streak_days": 3, "xp_points": 10, "achievements": "a;<b>_c"}])
+    assert "<script>" not in card and "<b>" not in card
+    assert html.escape(NAME) in card
+    assert html.escape("<b> c") in card  # latest achievement, underscores shown as spaces
+
+
+def test_module_titles_and_paths_are_escaped():
+    modules = load_csv("modules.csv").head(2).copy()
+    modules["title"] = [NAME, "Plain"]
+    modules["learning_path"] = ["<i>path</i>", "Budgeting Basics"]
+    first, second = module_cards(modules)
+    assert html.escape(NAME) in first and "<script>" not in first
+    assert "&lt;I&gt;Path&lt;/I&gt;" in first  # title-cased before escaping
+    assert "Plain" in second and "Budgeting Basics" in second
+
+
+def test_grid_holds_every_card_in_one_element():
+    cards = bundle_cards([{"tokens": 10, "price": 4.99}, {"tokens": 50, "price": 19.99}])
+    grid = card_grid(cards, columns=2)
+    assert grid.startswith("<div style='display: grid;") and grid.endswith("</div>")
+    assert "repeat(2," in grid and "€4.99" in grid and "€19.99" in grid
+    assert card_grid([], columns=3).count("<div") == 1
+
+
+def test_unchanged_rows_reuse_their_fragments():
+    friends = pd.DataFrame([{"name": "Ana", "streak_days": 1, "xp_points": 5, "achievements": ""}])
+    assert friend_cards(friends)[0] is friend_cards(friends.copy())[0]
@@ -0,0 +1,68 @@
+import importlib
+import os
+import pkgutil
+
+import pandas as pd
+import pytest
+
+import centinel
+from centinel import data
+from centinel.data import cache_info, clear_cache, load_csv
+
+
+@pytest.mark.parametrize("name", sorted(m.name for m in pkgutil.iter_modules(centinel.__path__)))
+def test_every_module_imports(name):
+    importlib.import_module(f"centinel.{name}")
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    calls = []
+    read_csv = pd.read_csv
+
+    def counted(path, *args, **kwargs):
+        calls.append(path)
+        return read_csv(path, *args, **kwargs)
+    monkeypatch.setattr(data.pd, "read_csv", counted)
+    clear_cache()
+    return calls
+
+
+def test_unchanged_file_is_read_once(tmp_path, reads):
+    path = tmp_path / "t.csv"
+    path.write_text("Date,Amount\n2025-01-02,1.5\n")
+    first = load_csv(path, parse_dates=["Date"])
+    second = load_csv(path, parse_dates=["Date"])
+    assert len(reads) == 1
+    assert first["Date"].dtype.kind == "M"
+    pd.testing.assert_frame_equal(first, second)
+    assert cache_info()["entries"] == 1
+
+
+def test_changed_file_is_read_again(tmp_path, reads):
+    path = tmp_path / "t.csv"
+    path.write_text("a\n1\n")
+    load_csv(path)
+    path.write_text("a\n1\n2\n")
+    os.utime(path, ns=(1, 1))  # a different mtime even on coarse clocks
+    assert load_csv(path)["a"].tolist() == [1, 2]
+    assert len(reads) == 2
+    assert cache_info()["entries"] == 1
+
+
+def test_callers_get_private_frames(tmp_path, reads):
+    path = tmp_path / "t.csv"
+    path.write_text("a\n1\n")
+    frame = load_csv(path)
+    frame.loc[0, "a"] = 99
+    assert load_csv(path)["a"].tolist() == [1]
+
+
+def test_cache_stays_within_budget(tmp_path, reads, monkeypatch):
+    monkeypatch.setattr(data, "CACHE_BUDGET_BYTES", 1)
+    for name in "abc":
+        (tmp_path / f"{name}.csv").write_text("a\n1\n")
+        load_csv(tmp_path / f"{name}.csv")
+    assert cache_info()["entries"] == 1  # only the latest file stays
+    load_csv(tmp_path / "c.csv")
+    assert len(reads) == 3
@@ -0,0 +1,13 @@
+import subprocess
+import sys
+
+from tests.conftest import ROOT
+
+LAZY = ["streamlit", "plotly", "sqlite3", "centinel.graph", "centinel.txstore", "centinel.users"]
+
+
+def test_import_leaves_heavy_modules_for_analyze():
+    # A fresh interpreter: this one already imported most of them.
+    code = f"import sys, centinel.engine; print([m for m in {LAZY!r} if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,12 @@
+import pandas as pd
+
+from benchmarks.generate import challenges, modules
+
+
+def test_catalogs_use_the_real_columns_and_values():
+    real_modules, real_challenges = pd.read_csv("modules.csv"), pd.read_csv("challenges.csv")
+    generated = modules(500)
+    assert list(generated.columns) == list(real_modules.columns)
+    assert set(generated["exclusive"]) == set(real_modules["exclusive"])
+    assert set(generated["access_level"]) == set(real_modules["access_level"])
+    assert list(challenges(50).columns) == list(real_challenges.columns)
@@ -0,0 +1,38 @@
+import pytest
+
+from centinel import instrument
+from centinel.instrument import span
+
+
+def reruns(page):
+    return instrument._reruns.get(page, {}).get("reruns", 0)
+
+
+def test_aborted_rerun_is_recorded_and_does_not_leak_spans():
+    before = reruns("aborted")
+    first = instrument.start("aborted")
+    with pytest.raises(RuntimeError):
+        try:
+            with span("first.page"):
+                raise RuntimeError("page failed")
+        finally:
+            instrument.finish(first)
+    assert not instrument.active()
+    with span("between.reruns"):
+        pass
+
+    second = instrument.start("aborted")
+    with span("second.page"):
+        pass
+    instrument.finish(second)
+
+    assert [s["span"] for s in first.spans] == ["first.page"]
+    assert [s["span"] for s in second.spans] == ["second.page"]
+    assert reruns("aborted") == before + 2
+
+
+def test_finish_is_idempotent():
+    trace = instrument.start("idempotent")
+    before = reruns("idempotent")
+    assert instrument.finish(trace) is instrument.finish(trace)
+    assert reruns("idempotent") == before + 1
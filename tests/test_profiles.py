@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import stat
+import threading
+
+import pandas as pd
+import pytest
+
+from centinel.profiles import COMPACT_INTERVAL, MAX_BACKOFF
+
+THREADS = 16
+INCREMENTS = 250
+
+
+def xp(log, user_id):
+    return int(log.directory.get(user_id)["xp_points"])
+
+
+def test_concurrent_increments_and_compaction_keep_every_change(log, tmp_path):
+    before = {user_id: xp(log, user_id) for user_id in ("U001", "U002")}
+    done = threading.Event()
+
+    def award(user_id):
+        for _ in range(INCREMENTS):
+            log.increment(user_id, xp_points=1)
+
+    def compact():
+        while not done.is_set():
+            log.compact()
+
+    compactor = threading.Thread(target=compact)
+    compactor.start()
+    writers = [threading.Thread(target=award, args=(("U001", "U002")[i % 2],)) for i in range(THREADS)]
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    compactor.join()
+    log.compact()
+
+    added = THREADS // 2 * INCREMENTS
+    assert xp(log, "U001") == before["U001"] + added
+    assert xp(log, "U002") == before["U002"] + added
+    assert log.stats["appended"] == THREADS * INCREMENTS
+    assert not os.path.exists(log.path) or os.path.getsize(log.path) == 0
+    # The CSVs and the progress file were rewritten from the directory.
+    assert int(pd.read_csv(tmp_path / "user_data.csv")["xp_points"].iloc[0]) == before["U001"] + added
+    assert int(pd.read_csv(tmp_path / "user2_data.csv")["xp_points"].iloc[0]) == before["U002"] + added
+    assert pd.read_json(tmp_path / "xp_progress.json", typ="series")["xp"] == before["U001"] + added
+
+
+def test_compaction_keeps_file_modes(log, tmp_path):
+    paths = [tmp_path / "user_data.csv", tmp_path / "xp_progress.json"]
+    for path in paths:
+        os.chmod(path, 0o644)
+    log.increment("U001", xp_points=1)
+    log.compact()
+    for path in paths:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+def test_failed_compaction_is_logged_and_backs_off(log, caplog):
+    broken = log._batch_pattern().replace("*", "1")
+    with open(broken, "w") as f:
+        f.write(json.dumps({"user_id": "U001", "set": {"favourite_colour": "green"}, "add": {}}) + "\n")
+    with caplog.at_level(logging.ERROR, logger="centinel.profiles"):
+        delay = log._compact_or_back_off(COMPACT_INTERVAL)
+        assert log._compact_or_back_off(delay) == min(delay * 2, MAX_BACKOFF) > COMPACT_INTERVAL
+    assert log.stats["errors"] == 2
+    assert log.error.startswith("ValueError")
+    assert "compaction failed" in caplog.text
+    os.remove(broken)
+    assert log._compact_or_back_off(MAX_BACKOFF) == COMPACT_INTERVAL
+    assert log.error is None
+
+
+def test_reads_overlay_pending_changes(log):
+    before = log.get("U001")
+    log.increment("U001", xp_points=5, token_balance=2)
+    log.update("U001", current_path="Investing Starters")
+    pending = log.get("U001")
+    assert pending["xp_points"] == before["xp_points"] + 5
+    assert pending["token_balance"] == before["token_balance"] + 2
+    assert pending["current_path"] == "Investing Starters"
+    log.compact()
+    assert log.get("U001")[["xp_points", "token_balance", "current_path"]].tolist() == pending[
+        ["xp_points", "token_balance", "current_path"]].tolist()
+
+
+def test_replayed_batch_applies_once(log):
+    before = xp(log, "U002")
+    updates = {"U002": ({}, {"xp_points": 10})}
+    assert log.directory.apply_batch("profiles.1.compacting", updates)
+    assert not log.directory.apply_batch("profiles.1.compacting", updates)
+    assert xp(log, "U002") == before + 10
+
+
+def test_rejects_unknown_fields(log):
+    with pytest.raises(ValueError):
+        log.update("U001", favourite_colour="green")
+    with pytest.raises(ValueError):
+        log.increment("U001", name=1)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from centinel import ranges
+from centinel.data import load_csv
+from centinel.ranges import DayIndex, range_summary, refresh_index
+from centinel.rollups import VALUES, build_rollup, update_rollup
+from centinel.triggers import trigger_matrix
+from centinel.txstore import file_dates, read_transactions, sync_user
+from tests.conftest import random_transactions
+
+RANGES = [(None, None), ("2025-01-10", "2025-02-01"), ("2025-02-01", None), (None, "2025-01-05")]
+SUMMARY_TRIGGERS = ["high_spending", "low_savings", "crypto_interest", "frequent_withdrawals", "new_investment_activity"]
+
+
+def assert_same_index(actual, expected):
+    assert (actual.days == expected.days).all()
+    for dim in expected.labels:
+        for start, end in RANGES:
+            pd.testing.assert_frame_equal(
+                actual.totals(dim, start, end).sort_index(), expected.totals(dim, start, end).sort_index(), atol=1e-9,
+            )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_extend_matches_build(seed):
+    df = random_transactions(seed).sort_values("Date", na_position="first", ignore_index=True)
+    rollup, meta = build_rollup(df.iloc[:200])
+    index = DayIndex.build(rollup)
+    rollup, meta = update_rollup(rollup, meta, df)
+    assert_same_index(index.extend(rollup), DayIndex.build(rollup))
+
+
+def test_extend_rebuilds_when_earlier_rows_move():
+    df = random_transactions(0).dropna(subset=["Date"]).sort_values("Date", ignore_index=True)
+    rollup, _ = build_rollup(df)
+    index = DayIndex.build(rollup)
+    # Moving a transaction between two earlier days keeps every total equal.
+    moved = df.copy()
+    moved.loc[0, "Date"] = moved.loc[len(df) // 2, "Date"]
+    rollup, _ = build_rollup(moved)
+    assert np.allclose(rollup[VALUES].sum().to_numpy(dtype=float), build_rollup(df)[0][VALUES].sum().to_numpy(dtype=float))
+    assert_same_index(index.extend(rollup), DayIndex.build(rollup))
+
+
+def test_range_triggers_match_trigger_matrix():
+    df = random_transactions(3)
+    # Matches the withdrawal and the crypto rules; its primary class is withdrawal.
+    both = pd.DataFrame({"Date": pd.to_datetime(["2025-01-12"]), "Category": ["Transfers"], "Merchant": ["PayPal Crypto Wallet"], "Amount": [-20.0]})
+    df = pd.concat([df[~df["Merchant"].fillna("").str.contains("Crypto Wallet")], both], ignore_index=True)
+    index = DayIndex.build(build_rollup(df)[0])
+    windows = {f"{start}-{end}": (start and pd.Timestamp(start), end and pd.Timestamp(end), "left") for start, end in RANGES}
+    matrix = trigger_matrix(df, windows, load_csv("modules.csv"))
+    assert matrix.loc["2025-01-10-2025-02-01", "crypto_interest"]
+    for (start, end), name in zip(RANGES, windows):
+        active = set(range_summary(index, start, end)["triggers"])
+        expected = {t for t in SUMMARY_TRIGGERS if matrix.at[name, t]}
+        assert active == expected, (start, end)
+
+
+@pytest.fixture
+def digests(monkeypatch):
+    calls = []
+
+    def counted(rollup, day):
+        calls.append(len(rollup))
+        return digest(rollup, day)
+    digest = ranges._digest
+    monkeypatch.setattr(ranges, "_digest", counted)
+    return calls
+
+
+def test_appends_from_the_last_day_skip_the_earlier_day_check(digests):
+    df = random_transactions(1).dropna(subset=["Date"]).sort_values("Date", ignore_index=True)
+    rollup, meta = build_rollup(df.iloc[:300])
+    index = DayIndex.build(rollup)
+    rollup, meta = update_rollup(rollup, meta, df)
+    digests.clear()
+    extended = index.extend(rollup, since=df.loc[300, "Date"])
+    assert sum(digests) < len(rollup) // 4  # only the newly settled days were hashed
+    assert_same_index(extended, DayIndex.build(rollup))
+
+
+def test_refresh_index_follows_the_transaction_store(tmp_path, digests):
+    csv, root = tmp_path / "tx.csv", str(tmp_path / "store")
+    lines = open("fake_transactions.csv").read().splitlines(keepends=True)
+    header, rows = lines[0], sorted(lines[1:])  # ISO dates first: sorted by day
+
+    def refresh(text):
+        csv.write_text(header + text)
+        manifest = sync_user("R", str(csv), root)
+        rollup = build_rollup(read_transactions("R", root=root))[0]
+        digests.clear()
+        index = refresh_index("R", rollup, (manifest["source"], ["rules"]), file_dates(manifest))
+        hashed = sum(digests)
+        assert_same_index(index, DayIndex.build(rollup))
+        return hashed
+
+    refresh("".join(rows[:-10]))
+    # Appended rows dated on or after the last day: only they are hashed.
+    assert refresh("".join(rows)) <= 10
+    # An appended row dated before it: every earlier row is checked.
+    assert refresh("".join(rows) + rows[0]) > 10
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from centinel.results import ResultCache
+
+
+def test_callers_cannot_change_the_cached_value():
+    cache = ResultCache()
+    frame = pd.DataFrame({"amount": [1.0, 2.0]})
+    value = {"frames": [frame], "totals": {"amount": frame["amount"]}, "name": "top"}
+    first = cache.get_or_compute("U001", "v1", "summary", lambda: value)
+
+    first["frames"][0].loc[0, "amount"] = 99.0
+    first["frames"].append(pd.DataFrame())
+    first["totals"]["amount"].iloc[1] = -1.0
+    first["name"] = "changed"
+
+    again = cache.get_or_compute("U001", "v1", "summary", lambda: None)
+    assert again["name"] == "top"
+    assert len(again["frames"]) == 1
+    assert again["frames"][0]["amount"].tolist() == [1.0, 2.0]
+    assert again["totals"]["amount"].tolist() == [1.0, 2.0]
+
+
+def test_tuples_and_scalars_come_back_unchanged():
+    cache = ResultCache()
+    value = (pd.Series([1, 2]), "best", 3)
+    shared = cache.get_or_compute("U001", "v1", "pair", lambda: value)
+    assert isinstance(shared, tuple)
+    assert shared[0] is not value[0] and shared[0].tolist() == [1, 2]
+    assert shared[1:] == ("best", 3)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from centinel.rollups import KEYS, VALUES, advance_rollup, build_rollup, update_rollup
+from tests.conftest import random_transactions
+from tests.test_trigger_state import chunked_loader
+
+
+def canonical(rollup):
+    return rollup.sort_values(KEYS, na_position="first", ignore_index=True)[KEYS + VALUES]
+
+
+def assert_same_rollup(actual, expected):
+    pd.testing.assert_frame_equal(canonical(actual), canonical(expected), check_dtype=False, atol=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_append_splits_match_full_build(seed):
+    df = random_transactions(seed)
+    rng = np.random.default_rng(seed)
+    rollup, meta = build_rollup(df.iloc[:0])
+    for end in sorted(rng.choice(np.arange(1, len(df)), 4, replace=False)) + [len(df)]:
+        rollup, meta = update_rollup(rollup, meta, df.iloc[:end])
+        assert meta["rows"] == end
+        assert_same_rollup(rollup, build_rollup(df.iloc[:end])[0])
+
+
+def test_chunked_feed_matches_full_build(export):
+    empty, meta = build_rollup(export.iloc[:0])
+    rollup, meta = advance_rollup(empty, meta, chunked_loader(export, 23))
+    assert meta["rows"] == len(export)
+    assert_same_rollup(rollup, build_rollup(export)[0])
+
+
+def test_rollup_totals_match_transactions(export):
+    rollup, _ = build_rollup(export)
+    assert rollup["amount"].sum() == pytest.approx(export["Amount"].sum())
+    assert rollup["spend"].sum() == pytest.approx(export.loc[export["Amount"] < 0, "Amount"].sum())
+    assert rollup["rows"].sum() == export["Amount"].notna().sum()
+
+
+def test_rewritten_export_rebuilds(export):
+    rollup, meta = build_rollup(export)
+    rewritten = export.copy()
+    rewritten.loc[len(export) - 1, "Amount"] -= 5
+    rollup, meta = update_rollup(rollup, meta, rewritten)
+    assert_same_rollup(rollup, build_rollup(rewritten)[0])
@@ -0,0 +1,51 @@
+import os
+import stat
+
+from centinel import state
+from centinel.state import atomic_write, write_json
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_files_get_the_umask_default_without_setting_it(tmp_path, monkeypatch):
+    plain = tmp_path / "plain.json"
+    plain.write_text("{}")
+
+    def umask(_):
+        raise AssertionError("os.umask changes the umask of every thread")
+    monkeypatch.setattr(os, "umask", umask)
+    write_json(tmp_path / "new.json", {})
+    assert mode(tmp_path / "new.json") == mode(plain)
+
+
+def test_replacement_keeps_the_mode_and_leaves_no_temp_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a\n1\n")
+    os.chmod(path, 0o640)
+    with atomic_write(path) as f:
+        f.write("a\n2\n")
+    assert path.read_text() == "a\n2\n"
+    assert mode(path) == 0o640
+    assert os.listdir(tmp_path) == ["data.csv"]
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("old")
+    try:
+        with atomic_write(path) as f:
+            f.write("partial")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["data.csv"]
+
+
+def test_umask_falls_back_when_proc_is_missing(monkeypatch):
+    def missing(*args, **kwargs):
+        raise FileNotFoundError
+    monkeypatch.setattr("builtins.open", missing)
+    assert state._umask() == 0o022
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from centinel.trigger_state import advance_state, frame_loader, rebuild_state, state_matrix, update_state, verify_state
+from centinel.triggers import build_windows, trigger_matrix
+from tests.conftest import random_transactions
+
+MODULES = pd.read_csv("modules.csv")
+
+
+def chunked_loader(df, size):
+    """A ``load_frames`` yielding ``df``'s rows in chunks of ``size``."""
+    def load_frames(first_row=0, last_row=None):
+        stop = len(df) if last_row is None else min(last_row, len(df))
+        for start in range(first_row, stop, size):
+            part = df.iloc[start:min(start + size, stop)]
+            yield part.set_axis(range(start, start + len(part)))
+    return load_frames
+
+
+def assert_state_matches(state, df):
+    windows = build_windows(df["Date"].max())
+    pd.testing.assert_frame_equal(state_matrix(state, windows, MODULES), trigger_matrix(df, windows, MODULES))
+    assert verify_state(state, df, windows, MODULES) == []
+
+
+def test_rebuild_matches_matrix(export):
+    assert_state_matches(rebuild_state(export), export)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_append_splits_match_matrix(seed):
+    df = random_transactions(seed).sort_values("Date", kind="stable").reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+    state = rebuild_state(df.iloc[:0])
+    for end in sorted(rng.choice(np.arange(1, len(df)), 4, replace=False)) + [len(df)]:
+        state = update_state(state, df.iloc[:end])
+        assert state["rows"] == end
+        assert_state_matches(state, df.iloc[:end])
+
+
+def test_chunked_feed_matches_single_frame(export):
+    state = advance_state(rebuild_state(export.iloc[:0]), chunked_loader(export, 17))
+    assert state["rows"] == len(export)
+    assert_state_matches(state, export)
+
+
+def test_rewritten_export_rebuilds(export):
+    state = rebuild_state(export)
+    rewritten = export.copy()
+    rewritten.loc[len(export) - 1, "Amount"] += 1
+    state = advance_state(state, frame_loader(rewritten))
+    assert state == rebuild_state(rewritten)
+    assert_state_matches(state, rewritten)
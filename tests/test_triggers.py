@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from centinel.triggers import TRIGGERS, build_windows, trigger_matrix
+from tests.conftest import random_transactions
+
+MODULES = pd.read_csv("modules.csv")
+
+
+def reference_triggers(data, modules_df):
+    """The per-window ``detect_triggers`` the matrix replaced, unchanged."""
+    triggers = set()
+    if data[data["Category"] == "Dining Out"]["Amount"].sum() < -150:
+        triggers.add("high_spending")
+    if data[data["Category"] == "Savings"]["Amount"].sum() < 20:
+        triggers.add("low_savings")
+    if data["Merchant"].str.contains("Crypto Wallet", na=False).any():
+        triggers.add("crypto_interest")
+    if data["Merchant"].str.contains("ATM|Venmo|Cash|PayPal", case=False, na=False).sum() >= 3:
+        triggers.add("frequent_withdrawals")
+    if "Budgeting 101" not in modules_df["title"].values:
+        triggers.add("no_budgeting_history")
+    if "Index ETF" in data["Merchant"].values:
+        triggers.add("new_investment_activity")
+    salary_months = data[data["Category"] == "Salary"]["Date"].dt.to_period("M").nunique()
+    if salary_months < 2:
+        triggers.add("unstable_income")
+    subs = data[data["Category"] == "Subscriptions"].copy()
+    subs["Week"] = subs["Date"].dt.to_period("W")
+    if subs.groupby("Week")["Merchant"].nunique().max() >= 2:
+        triggers.add("subscription_overlap")
+    return triggers
+
+
+def window_slice(df, start, end, closed):
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= (df["Date"] >= start) if closed == "left" else (df["Date"] > start)
+    if end is not None:
+        mask &= (df["Date"] < end) if closed == "left" else (df["Date"] <= end)
+    return df[mask]
+
+
+def assert_matches_reference(df, today, modules_df=MODULES):
+    windows = build_windows(today)
+    windows["all"] = (None, None, "left")
+    matrix = trigger_matrix(df, windows, modules_df)
+    assert list(matrix.columns) == TRIGGERS
+    for name, bounds in windows.items():
+        expected = reference_triggers(window_slice(df, *bounds), modules_df)
+        row = matrix.loc[name]
+        assert set(row[row].index) == expected, name
+
+
+def test_exports_match_reference(export):
+    for offset in range(0, 60, 3):
+        assert_matches_reference(export, export["Date"].max() - pd.Timedelta(days=offset))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_histories_match_reference(seed):
+    df = random_transactions(seed)
+    assert_matches_reference(df, df["Date"].max() - pd.Timedelta(days=seed))
+
+
+def test_budgeting_history_follows_modules(export):
+    without = MODULES[MODULES["title"] != "Budgeting 101"]
+    assert_matches_reference(export, export["Date"].max(), without)
@@ -0,0 +1,89 @@
+import shutil
+import threading
+
+import pandas as pd
+
+from centinel.txstore import _user_lock, read_transactions, sync_user
+from tests.conftest import read_transactions as read_csv
+
+
+def stored(user_id, root):
+    return read_transactions(user_id, root=root)[["Date", "Category", "Merchant", "Amount"]].astype(
+        {"Category": object, "Merchant": object}).reset_index(drop=True)
+
+
+def test_append_and_rewrite_match_csv(tmp_path):
+    csv = tmp_path / "tx.csv"
+    root = str(tmp_path / "store")
+    lines = open("fake_transactions.csv").read().splitlines(keepends=True)
+    csv.write_text("".join(lines[:60]))
+    sync_user("U", str(csv), root)
+    csv.write_text("".join(lines))  # grown: appended
+    sync_user("U", str(csv), root)
+    pd.testing.assert_frame_equal(stored("U", root), read_csv(csv), check_dtype=False)
+    csv.write_text("".join(lines[:1] + lines[2:]))  # rewritten: converted again
+    sync_user("U", str(csv), root)
+    pd.testing.assert_frame_equal(stored("U", root), read_csv(csv), check_dtype=False)
+
+
+def test_readers_never_miss_files_while_converting(tmp_path):
+    a, b = tmp_path / "a.csv", tmp_path / "b.csv"
+    shutil.copy("fake_transactions.csv", a)
+    shutil.copy("fake_transactions2.csv", b)
+    root = str(tmp_path / "store")
+    sync_user("U", str(a), root)
+    expected = {len(read_csv(a)), len(read_csv(b))}
+    errors, done = [], threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                assert len(read_transactions("U", root=root)) in expected
+            except Exception as exc:  # noqa: BLE001 - any failure fails the test
+                errors.append(exc)
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for i in range(30):
+        source = (a, b)[i % 2]
+        source.touch()  # new fingerprint: sync converts again
+        sync_user("U", str(source), root)
+    done.set()
+    for thread in readers:
+        thread.join()
+    assert errors == []
+
+
+def test_sync_lock_only_blocks_the_same_user(tmp_path):
+    root = str(tmp_path / "store")
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with _user_lock("A", root):
+            held.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(10)
+    entered = []
+
+    def sync_other():
+        with _user_lock("B", root):
+            entered.append("B")
+
+    def sync_same():
+        with _user_lock("A", root):
+            entered.append("A")
+
+    same, other = threading.Thread(target=sync_same), threading.Thread(target=sync_other)
+    same.start()
+    other.start()
+    other.join(5)
+    assert entered == ["B"]  # B syncs while A's sync is still running
+    release.set()
+    holder.join(5)
+    same.join(5)
+    assert entered == ["B", "A"]
@@ -0,0 +1,69 @@
+import os
+
+import pandas as pd
+import pytest
+
+from centinel.users import COLUMNS, UserDirectory
+
+HEADER = ",".join(COLUMNS) + "\n"
+
+
+def row(i, xp, streak, name=None, premium="False"):
+    return f"U{i:03d},{name or f'User {i}'},beginner,save_money,{premium},{i},Budgeting Basics,{xp},{streak},,\n"
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "users.csv"
+    # XP ties every third user; streaks tie in pairs.
+    path.write_text(HEADER + "".join(row(i, 100 * (i // 3), i // 2) for i in range(25, 0, -1)))
+    return path
+
+
+@pytest.fixture
+def directory(tmp_path, csv):
+    return UserDirectory(str(tmp_path / "users.db"), [str(csv)])
+
+
+def test_profiles_keep_their_types(directory):
+    profile = directory.get("U007")
+    assert profile["name"] == "User 7"
+    assert profile["xp_points"] == 200 and profile["token_balance"] == 7
+    assert profile["has_premium"] is False
+    assert directory.get("U999") is None
+
+
+def test_friends_pages_cover_everyone_else_once(directory):
+    seen, page = [], 0
+    while True:
+        profiles, has_more = directory.friends("U010", page=page, per_page=7)
+        seen += [p["user_id"] for p in profiles]
+        if not has_more:
+            break
+        page += 1
+    assert page == 3  # 24 friends: pages of 7, 7, 7 and 3
+    assert seen == [f"U{i:03d}" for i in range(1, 26) if i != 10]
+
+
+@pytest.mark.parametrize("by, column", [("xp", "xp_points"), ("streak", "streak_days")])
+def test_leaderboard_orders_by_score_then_user_id(directory, csv, by, column):
+    expected = pd.read_csv(csv).sort_values([column, "user_id"], ascending=[False, True]).head(5)
+    leaders = directory.leaderboard(by, n=5)
+    assert [p["user_id"] for p in leaders] == expected["user_id"].tolist()
+
+
+def test_changed_csv_is_imported_again(directory, csv):
+    assert directory.get("U001")["xp_points"] == 0
+    csv.write_text(HEADER + row(1, 5000, 1, name="Renamed", premium="True") + row(26, 10, 1))
+    os.utime(csv, ns=(1, 1))  # a different mtime even on coarse clocks
+    profile = directory.get("U001")
+    assert profile["name"] == "Renamed" and profile["xp_points"] == 5000 and profile["has_premium"] is True
+    assert directory.get("U026") is not None
+    assert directory.leaderboard("xp", n=1)[0]["user_id"] == "U001"
+
+
+def test_unchanged_csv_is_not_imported_again(directory, tmp_path, csv):
+    directory.update("U001", name="Edited")
+    # Another process opening the same database sees the edit, not the CSV row.
+    again = UserDirectory(str(tmp_path / "users.db"), [str(csv)])
+    assert again.get("U001")["name"] == "Edited"